@@ -4,32 +4,30 @@ from datetime import datetime
 from typing import Any
 
 # Basic components
-from astronomy import get_moon_longitude, get_sidereal_planets, calculate_lagna
-from ayanamsa import calculate_ayanamsa
-from nakshatra_utils import get_nakshatra
-
-# Charts
-from charts import get_rasi_chart
+from astronomy import ChartContext, _localize
 
 # Dasha modules
 from dasha import (
+    MAX_DASHA_DEPTH,
     get_dasha_balance_at_birth,
-    build_full_dasha_tree
+    iter_dasha_periods
 )
 
-# Panchanga
-from panchanga import calculate_panchanga
-
-# Strengths, Yogas, Remedies
-from strengths import planet_strength
-from yogas import detect_yogas
-from remedies import remedies_for_chart
+# Section stages (moon, planets, rasi_chart, ..., transits)
+from stages import (
+    ChartInput,
+    iter_stages,
+    run_stages,
+    select_sections,
+    stream_order,
+    volatile_sections,
+)
 
-# Divisional charts (Navamsa, Dasamsa, Saptamsa)
-from divisional import navamsa, dasamsa, saptamsa
+# Natal result cache
+from natal_cache import natal_cache
 
-# Transits (Gochar)
-from transits import current_transits, transit_vs_natal, sade_sati
+# Per-stage timers
+from metrics import step
 
 try:
     import numpy as np
@@ -65,111 +63,134 @@ def _make_json_safe(obj: Any):
     return _json_safe(obj)
 
 
-def astrology_full(dob, tob, tz_str, latitude, longitude):
-
+def _plan_request(dob, tob, tz_str, latitude, longitude, dasha_levels, dasha_expand,
+                  use_cache, json_safe, include, exclude, timings):
+    sections = select_sections(include, exclude)
+    if not sections:
+        raise ValueError("No sections selected.")
+    chart = ChartInput(dob, tob, tz_str, latitude, longitude, dasha_levels, dasha_expand, timings)
+    # Reject a bad timezone up front; the ChartContext itself stays lazy for cache hits
+    _localize(chart.dt, tz_str)
+    volatile = volatile_sections(dasha_expand)
+
+    key = natal_cache.key(
+        dob, tob, tz_str, latitude, longitude, dasha_levels, dasha_expand,
+        "json" if json_safe else "raw",
+    )
+    with step(timings, "cache"):
+        # raw payloads would come back from the JSON disk tier as strings
+        cached = (natal_cache.get(key, disk=json_safe) if use_cache else None) or {}
+    known = {name: value for name, value in cached.items() if name not in volatile}
+    return sections, chart, volatile, key, known
+
+
+def _store_sections(key, known, computed, volatile, json_safe, timings):
+    stable = {name: value for name, value in computed.items() if name not in volatile}
+    if stable:
+        with step(timings, "cache"):
+            natal_cache.put(key, {**known, **stable}, disk=json_safe)
+
+
+def astrology_full(dob, tob, tz_str, latitude, longitude,
+                   dasha_levels=MAX_DASHA_DEPTH, dasha_expand="all", use_cache=True,
+                   json_safe=True, include=None, exclude=None, timings=None):
+    """
+    Chart payload with the sections in `include` (default: all of
+    stages.SECTIONS) minus those in `exclude`; only the stages they need
+    are run. Stable sections come from natal_cache when possible; meta,
+    transits (and a "current" dasha expansion) are recomputed on every call.
+
+    With json_safe=False the datetimes and NumPy scalars are left in place
+    for a serializer that handles them itself (serialization.dumps).
+
+    Pass a metrics.Timings as `timings` to collect seconds per stage.
+    """
     try:
-        lat = latitude
-        lon = longitude
-        dt = datetime.strptime(dob + " " + tob, "%Y-%m-%d %H:%M")
-        ayan = calculate_ayanamsa(dt)
-
-        moon_lon_trop = get_moon_longitude(dt, lat, lon, tz_str)
-        moon_sidereal = (moon_lon_trop - ayan) % 360
-
-        nak = get_nakshatra(moon_sidereal)
-
-        lagna_deg = calculate_lagna(dt, lat, lon, tz_str)
-        lagna = {
-            "degree": lagna_deg,
-            "sign_index": int(lagna_deg // 30)
-        }
-
-        planets = get_sidereal_planets(dt, lat, lon, tz_str)
-        rasi_chart = get_rasi_chart(lagna_deg, planets)
-
-        panchanga = calculate_panchanga(planets["Sun"], planets["Moon"])
-
-        dasha_balance = get_dasha_balance_at_birth(moon_sidereal)
-        full_dasha = build_full_dasha_tree(
-            dasha_balance["starting_mahadasha"],
-            dt,
-            moon_sidereal
+        sections, chart, volatile, key, known = _plan_request(
+            dob, tob, tz_str, latitude, longitude, dasha_levels, dasha_expand,
+            use_cache, json_safe, include, exclude, timings,
         )
 
-        planet_strength_list = []
-        for name, lon in planets.items():
-            ps = planet_strength(name, lon, sun_longitude=planets["Sun"])
-            planet_strength_list.append(ps)
+        computed = run_stages(chart, sections, known, timings)
+        if json_safe:
+            with step(timings, "json_safe"):
+                computed = {name: _make_json_safe(value) for name, value in computed.items()}
+        if use_cache:
+            _store_sections(key, known, computed, volatile, json_safe, timings)
 
-        yogas = detect_yogas(rasi_chart["planets"])
+        available = {**known, **computed}
+        result = {name: available[name] for name in sections}
 
-        divisional = {
-            name: {
-                "D9": navamsa(lon),
-                "D10": dasamsa(lon),
-                "D7": saptamsa(lon)
-            }
-            for name, lon in planets.items()
-        }
+    except Exception as exc:
+        raise AstrologyComputationError(
+            f"Failed to compute astrology data: {exc}"
+        ) from exc
 
-        remedies = remedies_for_chart(planet_strength_list)
+    return result
 
-        transit_planets = current_transits(datetime.now(), lat, lon, tz_str)
-        transit_comparison = transit_vs_natal(planets, transit_planets)
 
-        sade_sati_status = sade_sati(
-            natal_moon_lon=moon_sidereal,
-            saturn_transit_lon=transit_planets["Saturn"]
+def astrology_section_stream(dob, tob, tz_str, latitude, longitude,
+                             dasha_levels=MAX_DASHA_DEPTH, dasha_expand="all", use_cache=True,
+                             json_safe=True, include=None, exclude=None, timings=None):
+    """
+    Same sections as astrology_full, as a generator of (section, value)
+    pairs in the order they become available: cached sections first, then
+    each computed one as soon as its stage finishes, with the dasha tree
+    and transits last. Input errors are raised here; errors while
+    computing are raised by the generator as AstrologyComputationError.
+    """
+    try:
+        sections, chart, volatile, key, known = _plan_request(
+            dob, tob, tz_str, latitude, longitude, dasha_levels, dasha_expand,
+            use_cache, json_safe, include, exclude, timings,
         )
-
     except Exception as exc:
         raise AstrologyComputationError(
             f"Failed to compute astrology data: {exc}"
         ) from exc
 
-    result = {
-        "meta": {
-            "dob": dob,
-            "tob": tob,
-            "timezone": tz_str,
-            "latitude": lat,
-            "longitude": lon
-        },
-
-        "ayanamsa": ayan,
-
-        "moon": {
-            "tropical": moon_lon_trop,
-            "sidereal": moon_sidereal,
-            "nakshatra": nak
-        },
-
-        "lagna": lagna,
-
-        "planets": planets,
-
-        "rasi_chart": rasi_chart,
-
-        "panchanga": panchanga,
-
-        "dasha": {
-            "balance": dasha_balance,
-            "dv": full_dasha
-        },
-
-        "strengths": planet_strength_list,
-
-        "yogas": yogas,
-
-        "divisional": divisional,
-
-        "remedies": remedies,
-
-        "transits": {
-            "current": transit_planets,
-            "comparison": transit_comparison,
-            "sade_sati": sade_sati_status
-        }
-    }
+    def generate():
+        wanted = set(sections)
+        for name in sections:
+            if name in known:
+                yield name, known[name]
+
+        computed = {}
+        try:
+            for name, value in iter_stages(chart, stream_order(sections), known, timings):
+                if json_safe:
+                    with step(timings, "json_safe"):
+                        value = _make_json_safe(value)
+                computed[name] = value
+                if name in wanted:
+                    yield name, computed[name]
+        except Exception as exc:
+            raise AstrologyComputationError(
+                f"Failed to compute astrology data: {exc}"
+            ) from exc
+
+        if use_cache:
+            _store_sections(key, known, computed, volatile, json_safe, timings)
+
+    return generate()
+
+
+def dasha_period_stream(dob, tob, tz_str, latitude, longitude,
+                        depth=5, window_start=None, window_end=None):
+    """
+    Compute the natal Moon, then return a generator of JSON-safe dasha
+    periods (see dasha.iter_dasha_periods). Input errors are raised here,
+    before the first period is produced.
+    """
+    try:
+        dt = datetime.strptime(dob + " " + tob, "%Y-%m-%d %H:%M")
+        ctx = ChartContext(dt, latitude, longitude, tz_str)
+        moon_sidereal = (ctx.tropical_longitude("Moon") - ctx.ayanamsa) % 360
+        starting_lord = get_dasha_balance_at_birth(moon_sidereal)["starting_mahadasha"]
+        periods = iter_dasha_periods(starting_lord, dt, depth, window_start, window_end)
+    except Exception as exc:
+        raise AstrologyComputationError(
+            f"Failed to compute dasha periods: {exc}"
+        ) from exc
 
-    return _make_json_safe(result)
+    return (_make_json_safe(period) for period in periods)
@@ -1,9 +1,12 @@
 # astronomy.py
 
 from skyfield.api import load, wgs84
+import numpy as np
 import pytz
 from datetime import datetime
 from ayanamsa import calculate_ayanamsa
+from config import EPHEMERIS_TABLE_DIR
+from ephemeris_table import EphemerisTable, utc_days
 
 # The full DE441 kernel is > 3GB and cannot be memory-mapped by 32-bit Python.
 # Use the lighter DE421 kernel instead so the project works on all platforms.
@@ -28,31 +31,134 @@ planets_sf = {
     "Saturn": eph["saturn barycenter"],
 }
 
+# Column order of the arrays returned by the batch API
+PLANET_NAMES = list(planets_sf)
+
 # Earth center for building a topocentric observer
 earth = eph["earth"]
 
+# Loading the timescale parses leap-second and delta-T tables; do it once.
+ts = load.timescale()
 
-def skyfield_time(dt, tz_str):
+# Optional precomputed Chebyshev table (see ephemeris_table.py)
+_table = None
+
+
+def use_ephemeris_table(directory):
+    """Answer longitudes from the table in `directory`; None = Skyfield only."""
+    global _table
+    _table = EphemerisTable(directory) if directory else None
+    return _table
+
+
+if EPHEMERIS_TABLE_DIR:
+    use_ephemeris_table(EPHEMERIS_TABLE_DIR)
+
+
+def _localize(dt, tz_str):
     try:
         tz = pytz.timezone(tz_str)
     except pytz.UnknownTimeZoneError as exc:
         raise ValueError(f"Unknown timezone '{tz_str}'.") from exc
 
     try:
-        dt_local = tz.localize(dt)
+        return tz.localize(dt)
     except Exception as exc:
         raise ValueError(f"Could not localize datetime {dt} for timezone {tz_str}.") from exc
 
-    ts = load.timescale()
+
+def skyfield_time(dt, tz_str):
+    dt_local = _localize(dt, tz_str)
     return ts.from_datetime(dt_local)
 
 
+def _table_covers(days):
+    return _table is not None and _table.covers(days)
+
+
+# ----------------------------------------------------
+# Per-chart context (time + observer computed once)
+# ----------------------------------------------------
+class ChartContext:
+    """
+    Everything that stays fixed while one chart is computed: the Skyfield
+    time, the topocentric observer and the ayanamsa.
+
+    Build it once per request and pass it as ``ctx=`` to the functions
+    below; longitudes are memoised per body, so asking for the Moon and
+    then for all planets observes the Moon only once.  When an ephemeris
+    table is loaded and covers dt, longitudes come from the table and no
+    Skyfield time is built unless the lagna is requested.
+    """
+
+    def __init__(self, dt, lat, lon, tz_str):
+        self.dt = dt
+        self.lat = lat
+        self.lon = lon
+        self.tz_str = tz_str
+        self.dt_local = _localize(dt, tz_str)
+        self.utc_days = utc_days(self.dt_local)
+        self.topos = wgs84.latlon(latitude_degrees=lat, longitude_degrees=lon)
+        self.ayanamsa = calculate_ayanamsa(dt)
+        self._t = None
+        self._observer = None
+        self._longitudes = {}
+        self._lagna = None
+
+    @property
+    def t(self):
+        if self._t is None:
+            self._t = ts.from_datetime(self.dt_local)
+        return self._t
+
+    @property
+    def observer(self):
+        if self._observer is None:
+            try:
+                self._observer = (earth + self.topos).at(self.t)
+            except Exception as exc:
+                raise RuntimeError(
+                    f"Failed to build observer for lat={self.lat}, lon={self.lon}"
+                ) from exc
+        return self._observer
+
+    def tropical_longitude(self, name):
+        if name not in self._longitudes and _table_covers(self.utc_days):
+            self._longitudes.update(_table.tropical_planets(self.utc_days, self.lat, self.lon))
+        if name not in self._longitudes:
+            self._longitudes[name] = planet_topocentric_longitude(
+                planets_sf[name], self.t, self.lat, self.lon, observer=self.observer
+            )
+        return self._longitudes[name]
+
+    def tropical_planets(self):
+        return {name: self.tropical_longitude(name) for name in planets_sf}
+
+    def sidereal_planets(self):
+        return {
+            name: (deg - self.ayanamsa) % 360
+            for name, deg in self.tropical_planets().items()
+        }
+
+    def lagna(self):
+        if self._lagna is None:
+            asc = self.topos.at(self.t).from_altaz(alt_degrees=0, az_degrees=90)
+            _, lon_deg, _ = asc.ecliptic_latlon()
+            self._lagna = lon_deg.degrees % 360
+        return self._lagna
+
+
+def _context(dt, lat, lon, tz_str, ctx):
+    return ctx if ctx is not None else ChartContext(dt, lat, lon, tz_str)
+
+
 # ----------------------------------------------------
 # Convert planet to TOPOCENTRIC longitude
 # ----------------------------------------------------
-def planet_topocentric_longitude(planet, t, lat, lon):
+def planet_topocentric_longitude(planet, t, lat, lon, observer=None):
     try:
-        observer = (earth + wgs84.latlon(latitude_degrees=lat, longitude_degrees=lon)).at(t)
+        if observer is None:
+            observer = (earth + wgs84.latlon(latitude_degrees=lat, longitude_degrees=lon)).at(t)
         topo = observer.observe(planet).apparent()
         _, lon_deg, _ = topo.ecliptic_latlon()
         return lon_deg.degrees % 360
@@ -65,49 +171,108 @@ def planet_topocentric_longitude(planet, t, lat, lon):
 # ----------------------------------------------------
 # Moon longitude
 # ----------------------------------------------------
-def get_moon_longitude(dt, lat, lon, tz_str):
-    t = skyfield_time(dt, tz_str)
-    return planet_topocentric_longitude(planets_sf["Moon"], t, lat, lon)
+def get_moon_longitude(dt, lat, lon, tz_str, ctx=None):
+    return _context(dt, lat, lon, tz_str, ctx).tropical_longitude("Moon")
 
 
 # ----------------------------------------------------
 # All planets (tropical)
 # ----------------------------------------------------
-def get_tropical_planets(dt, lat, lon, tz_str):
-    t = skyfield_time(dt, tz_str)
-
-    results = {}
-    for name, planet in planets_sf.items():
-        results[name] = planet_topocentric_longitude(planet, t, lat, lon)
-
-    return results
+def get_tropical_planets(dt, lat, lon, tz_str, ctx=None):
+    return _context(dt, lat, lon, tz_str, ctx).tropical_planets()
 
 
 # ----------------------------------------------------
 # Sidereal planets
 # ----------------------------------------------------
-def get_sidereal_planets(dt, lat, lon, tz_str):
-    tropical = get_tropical_planets(dt, lat, lon, tz_str)
-    ayan = calculate_ayanamsa(dt)
-    return {name: (deg - ayan) % 360 for name, deg in tropical.items()}
+def get_sidereal_planets(dt, lat, lon, tz_str, ctx=None):
+    return _context(dt, lat, lon, tz_str, ctx).sidereal_planets()
 
 
 # ----------------------------------------------------
 # Lagna (Ascendant)
 # ----------------------------------------------------
-def calculate_lagna(dt, lat, lon, tz_str):
-    t = skyfield_time(dt, tz_str)
-
-    observer = wgs84.latlon(latitude_degrees=lat, longitude_degrees=lon).at(t)
+def calculate_lagna(dt, lat, lon, tz_str, ctx=None):
+    return _context(dt, lat, lon, tz_str, ctx).lagna()
 
-    asc = observer.from_altaz(alt_degrees=0, az_degrees=90)
-    _, lon_deg, _ = asc.ecliptic_latlon()
 
-    return lon_deg.degrees % 360
+def get_planet_longitudes(dt, lat, lon, tz_str, sidereal=True, ctx=None):
+    if sidereal:
+        return get_sidereal_planets(dt, lat, lon, tz_str, ctx=ctx)
+    else:
+        return get_tropical_planets(dt, lat, lon, tz_str, ctx=ctx)
 
 
-def get_planet_longitudes(dt, lat, lon, tz_str, sidereal=True):
-    if sidereal:
+# ----------------------------------------------------
+# Table lookup (microseconds, no Skyfield objects)
+# ----------------------------------------------------
+def lookup_sidereal_planets(dt, lat, lon, tz_str):
+    """
+    Sidereal longitudes from the precomputed ephemeris table.
+    Falls back to the full Skyfield path when no table is loaded or dt is
+    outside its range; see ephemeris_table.py for the documented error.
+    """
+    days = utc_days(_localize(dt, tz_str))
+    if not _table_covers(days):
         return get_sidereal_planets(dt, lat, lon, tz_str)
+
+    ayan = calculate_ayanamsa(dt)
+    tropical = _table.tropical_planets(days, lat, lon)
+    return {name: (tropical[name] - ayan) % 360 for name in planets_sf}
+
+
+# ----------------------------------------------------
+# Batch ephemeris (many charts, one Skyfield pass)
+# ----------------------------------------------------
+def get_planets_batch(dts, lats, lons, tz_strs):
+    """
+    Vectorised counterpart of get_tropical_planets / get_sidereal_planets.
+
+    dts: sequence of naive local datetimes
+    lats, lons: sequences of degrees (same length as dts)
+    tz_strs: a single IANA timezone for every chart, or one per chart
+
+    Builds a single Skyfield Time array and observer, so each body is
+    observed once for the whole batch instead of once per chart.
+    Returns (tropical, sidereal): float arrays of shape (N, len(PLANET_NAMES)),
+    columns ordered as PLANET_NAMES.
+    """
+    dts = list(dts)
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    if isinstance(tz_strs, str):
+        tz_strs = [tz_strs] * len(dts)
     else:
-        return get_tropical_planets(dt, lat, lon, tz_str)
+        tz_strs = list(tz_strs)
+
+    n = len(dts)
+    if not (lats.shape == lons.shape == (n,) and len(tz_strs) == n):
+        raise ValueError(
+            "dts, lats, lons and tz_strs must be one-dimensional and of equal length."
+        )
+
+    tropical = np.empty((n, len(PLANET_NAMES)))
+    if n == 0:
+        return tropical, tropical.copy()
+
+    dts_local = [_localize(dt, tz) for dt, tz in zip(dts, tz_strs)]
+    days = np.array([utc_days(dt_local) for dt_local in dts_local])
+    ayan = np.array([calculate_ayanamsa(dt) for dt in dts])
+
+    if _table_covers(days):
+        looked_up = _table.tropical_longitudes(days, lats, lons)
+        tropical[:] = looked_up[:, [_table.bodies.index(name) for name in PLANET_NAMES]]
+        return tropical, (tropical - ayan[:, None]) % 360
+
+    t = ts.from_datetimes(dts_local)
+
+    try:
+        observer = (earth + wgs84.latlon(latitude_degrees=lats, longitude_degrees=lons)).at(t)
+        for col, name in enumerate(PLANET_NAMES):
+            _, lon_deg, _ = observer.observe(planets_sf[name]).apparent().ecliptic_latlon()
+            tropical[:, col] = lon_deg.degrees % 360
+    except Exception as exc:
+        raise RuntimeError(f"Failed to compute batch topocentric longitudes for {n} charts") from exc
+
+    sidereal = (tropical - ayan[:, None]) % 360
+    return tropical, sidereal
@@ -0,0 +1,79 @@
+# batch.py
+# Fan many astrology_full calls out over a process pool (one warm ephemeris per process).
+
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from config import BATCH_WORKERS
+from metrics import stage_seconds
+
+logger = logging.getLogger("astrology_api.batch")
+
+_pool = None
+
+
+def _warm_worker():
+    # Importing astrology_full loads the DE421 kernel and timescale once per process
+    import astrology_full  # noqa: F401
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=BATCH_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_worker,
+        )
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def compute_item(kwargs):
+    """Run astrology_full(**kwargs) in a worker; never raises."""
+    from astrology_full import astrology_full, AstrologyComputationError
+    from metrics import Timings
+
+    timings = Timings()
+    try:
+        return {"ok": True, "result": astrology_full(**kwargs, timings=timings), "timings": timings}
+    except AstrologyComputationError as exc:
+        return {"ok": False, "error": str(exc)}
+    except Exception:
+        logger.exception("Unexpected error in batch item")
+        return {"ok": False, "error": "Internal server error"}
+
+
+async def run_batch(items):
+    """
+    items: list of astrology_full keyword dicts.
+    Returns one {"index", "ok", "result" | "error"} dict per item, in order.
+    """
+    loop = asyncio.get_running_loop()
+    pool = get_pool()
+    futures = [loop.run_in_executor(pool, compute_item, kwargs) for kwargs in items]
+    outcomes = await asyncio.gather(*futures, return_exceptions=True)
+
+    failures = [outcome for outcome in outcomes if isinstance(outcome, BaseException)]
+    if failures:
+        logger.error("%d of %d batch items failed in the pool: %r", len(failures), len(items), failures[0])
+    if any(isinstance(outcome, BrokenProcessPool) for outcome in failures):
+        # A worker died; start a fresh pool for the next batch
+        shutdown_pool()
+
+    results = []
+    for index, outcome in enumerate(outcomes):
+        if isinstance(outcome, BaseException):
+            outcome = {"ok": False, "error": "Worker process failed"}
+        stage_seconds.observe_all(outcome.pop("timings", {}))
+        results.append({"index": index, **outcome})
+    return results
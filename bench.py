@@ -0,0 +1,246 @@
+# bench.py
+# Local benchmark suite: seeded birth-input corpus, per-module and
+# end-to-end timings, JSON results and regression comparison.
+#
+#   python bench.py run [--size 40] [--repeat 5] [--filter dasha] [--out FILE]
+#   python bench.py compare OLD.json NEW.json [--threshold 10]
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from corpus import DEFAULT_SEED, DEFAULT_SIZE, make_corpus
+
+# Keep the background transit refresher out of the measurements
+os.environ.setdefault("TRANSIT_REFRESH", "0")
+
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 10.0  # percent
+RESULTS_DIR = Path("bench_results")
+
+
+# ----------------------------------------------------
+# Benchmarks: name -> (setup(item) -> args, fn(args), before_each_pass)
+# ----------------------------------------------------
+def _benchmarks():
+    from astronomy import ChartContext, calculate_lagna, get_sidereal_planets
+    from astrology_full import _make_json_safe, astrology_full
+    from charts import get_rasi_chart
+    from dasha import build_dasha_tree, dasha_at, get_dasha_balance_at_birth
+    from divisional import dasamsa, navamsa, saptamsa
+    from natal_cache import natal_cache
+    from panchanga import calculate_panchanga
+    from serialization import dumps
+    from strengths import planet_strength
+    from yogas import detect_yogas
+
+    def chart(item):
+        dt = datetime.strptime(item["dob"] + " " + item["tob"], "%Y-%m-%d %H:%M")
+        ctx = ChartContext(dt, item["latitude"], item["longitude"], item["tz_str"])
+        planets = get_sidereal_planets(dt, item["latitude"], item["longitude"], item["tz_str"], ctx=ctx)
+        lagna = calculate_lagna(dt, item["latitude"], item["longitude"], item["tz_str"], ctx=ctx)
+        lord = get_dasha_balance_at_birth(planets["Moon"])["starting_mahadasha"]
+        return {"item": item, "dt": dt, "planets": planets, "lagna": lagna, "lord": lord,
+                "moon": planets["Moon"], "rasi": get_rasi_chart(lagna, planets)}
+
+    def context(c):
+        return ChartContext(c["dt"], c["item"]["latitude"], c["item"]["longitude"], c["item"]["tz_str"])
+
+    def sidereal_planets(c):
+        i = c["item"]
+        get_sidereal_planets(c["dt"], i["latitude"], i["longitude"], i["tz_str"], ctx=context(c))
+
+    def lagna(c):
+        i = c["item"]
+        calculate_lagna(c["dt"], i["latitude"], i["longitude"], i["tz_str"], ctx=context(c))
+
+    def divisional(c):
+        for lon in c["planets"].values():
+            navamsa(lon), dasamsa(lon), saptamsa(lon)
+
+    def strengths(c):
+        for name, lon in c["planets"].items():
+            planet_strength(name, lon, sun_longitude=c["planets"]["Sun"])
+
+    def full_raw(item):
+        return astrology_full(**item, use_cache=False, json_safe=False)
+
+    return {
+        "astronomy.context": (chart, context, None),
+        "astronomy.sidereal_planets": (chart, sidereal_planets, None),
+        "astronomy.lagna": (chart, lagna, None),
+        "dasha.build_dasha_tree": (chart, lambda c: build_dasha_tree(c["lord"], c["dt"], depth=3), None),
+        "dasha.dasha_at": (
+            chart, lambda c: dasha_at(c["moon"], c["dt"], c["dt"] + timedelta(days=12000), 5), None
+        ),
+        "divisional.all_planets": (chart, divisional, None),
+        "yogas.detect_yogas": (chart, lambda c: detect_yogas(c["rasi"]["planets"]), None),
+        "strengths.all_planets": (chart, strengths, None),
+        "panchanga.calculate_panchanga": (
+            chart, lambda c: calculate_panchanga(c["planets"]["Sun"], c["planets"]["Moon"]), None
+        ),
+        "serialization.default": (full_raw, lambda p: json.dumps(_make_json_safe(p)), None),
+        "serialization.single_pass": (full_raw, dumps, None),
+        "astrology_full.uncached": (dict, lambda item: astrology_full(**item, use_cache=False), None),
+        # warm-up fills the natal cache, so every timed call is a hit
+        "astrology_full.cached": (dict, lambda item: astrology_full(**item), None),
+        # every timed call is a natal cache miss
+        "app.astrology": (_request_body, _post_astrology, natal_cache.clear),
+    }
+
+
+_client = None
+
+
+def _request_body(item):
+    return {
+        "dob": item["dob"], "tob": item["tob"], "tz": item["tz_str"],
+        "latitude": item["latitude"], "longitude": item["longitude"],
+    }
+
+
+def _post_astrology(body):
+    global _client
+    if _client is None:
+        from fastapi.testclient import TestClient
+        from server import app
+
+        _client = TestClient(app)
+    _client.post("/astrology", json=body).raise_for_status()
+
+
+# ----------------------------------------------------
+# Run
+# ----------------------------------------------------
+def _summary(samples):
+    ordered = sorted(samples)
+    return {
+        "calls": len(ordered),
+        "min_us": ordered[0] * 1e6,
+        "median_us": statistics.median(ordered) * 1e6,
+        "mean_us": statistics.fmean(ordered) * 1e6,
+        "p95_us": ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))] * 1e6,
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(size=DEFAULT_SIZE, seed=DEFAULT_SEED, repeat=DEFAULT_REPEAT, name_filter=None):
+    """
+    Time every benchmark over the corpus `repeat` times, after one warm-up
+    pass. Setup work (building the inputs a function needs) is not timed.
+    """
+    import numpy
+    import skyfield
+
+    corpus = make_corpus(size, seed)
+    results = {}
+
+    for name, (setup, fn, before_each_pass) in _benchmarks().items():
+        if name_filter and name_filter not in name:
+            continue
+        inputs = [setup(item) for item in corpus]
+        for args in inputs:  # warm-up: kernel pages, lru caches, transit tiles
+            fn(args)
+
+        samples = []
+        for _ in range(repeat):
+            if before_each_pass is not None:
+                before_each_pass()
+            for args in inputs:
+                start = time.perf_counter()
+                fn(args)
+                samples.append(time.perf_counter() - start)
+        results[name] = _summary(samples)
+        print(f"  {name:<32} median {results[name]['median_us']:10.1f} us")
+
+    return {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "git": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": numpy.__version__,
+            "skyfield": skyfield.__version__,
+            "seed": seed,
+            "corpus_size": size,
+            "repeat": repeat,
+        },
+        "benchmarks": results,
+    }
+
+
+# ----------------------------------------------------
+# Compare
+# ----------------------------------------------------
+def compare(old, new, threshold=DEFAULT_THRESHOLD, metric="median_us"):
+    """
+    Rows of (name, old, new, change %, flag) for benchmarks present in
+    both runs; flag is "REGRESSION" when `metric` grew by more than
+    `threshold` percent, "improved" when it shrank by as much.
+    """
+    rows = []
+    for name, before in old["benchmarks"].items():
+        after = new["benchmarks"].get(name)
+        if after is None:
+            continue
+        change = (after[metric] - before[metric]) / before[metric] * 100.0
+        flag = "REGRESSION" if change > threshold else "improved" if change < -threshold else ""
+        rows.append((name, before[metric], after[metric], change, flag))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run or compare the local benchmark suite.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="Time every benchmark and write JSON results.")
+    run.add_argument("--size", type=int, default=DEFAULT_SIZE, help="charts in the corpus")
+    run.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    run.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="timed passes over the corpus")
+    run.add_argument("--filter", dest="name_filter", help="only benchmarks whose name contains this")
+    run.add_argument("--out", help=f"results file (default: {RESULTS_DIR}/<timestamp>.json)")
+
+    cmp_ = sub.add_parser("compare", help="Flag regressions between two result files.")
+    cmp_.add_argument("old")
+    cmp_.add_argument("new")
+    cmp_.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="percent")
+    cmp_.add_argument("--metric", default="median_us", choices=["min_us", "median_us", "mean_us", "p95_us"])
+
+    args = parser.parse_args()
+    if args.command == "run":
+        print(f"Benchmarking {args.size} charts (seed {args.seed}), {args.repeat} passes:")
+        report = run_suite(args.size, args.seed, args.repeat, args.name_filter)
+        out = Path(args.out) if args.out else RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"Results written to {out.resolve()}")
+    else:
+        old = json.loads(Path(args.old).read_text(encoding="utf-8"))
+        new = json.loads(Path(args.new).read_text(encoding="utf-8"))
+        rows = compare(old, new, args.threshold, args.metric)
+        print(f"{'benchmark':<32} {'old':>12} {'new':>12} {'change':>9}")
+        for name, before, after, change, flag in rows:
+            print(f"{name:<32} {before:12.1f} {after:12.1f} {change:+8.1f}%  {flag}")
+        regressions = [row for row in rows if row[4] == "REGRESSION"]
+        if regressions:
+            print(f"{len(regressions)} regression(s) above {args.threshold:g}% ({args.metric})")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# bench_serialization.py
+# Time encoding of one full /astrology payload (depth-3 dasha tree, 729
+# pratyantardashas): the default path vs the single-pass serialization.dumps.
+#
+#   python bench_serialization.py [repeats]
+
+import json
+import sys
+import time
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from astrology_full import _make_json_safe, astrology_full
+from serialization import dumps, orjson
+
+CHART = {
+    "dob": "1977-08-04",
+    "tob": "01:30",
+    "tz_str": "Asia/Kolkata",
+    "latitude": 16.1817369,
+    "longitude": 81.1348181,
+}
+
+
+def default_path(raw):
+    # astrology_full(json_safe=True), then what FastAPI does with a returned dict
+    return JSONResponse(jsonable_encoder(_make_json_safe(raw))).body
+
+
+def fast_path(raw):
+    return dumps(raw)
+
+
+def best_of(fn, raw, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(raw)
+        timings.append(time.perf_counter() - start)
+    return min(timings), sum(timings) / len(timings)
+
+
+if __name__ == "__main__":
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    raw = astrology_full(**CHART, use_cache=False, json_safe=False)
+
+    before, after = default_path(raw), fast_path(raw)
+    assert json.loads(before) == json.loads(after), "encoders disagree"
+
+    leaves = sum(len(ad["pratyantardashas"]) for md in raw["dasha"]["dv"] for ad in md["antardashas"])
+    print(f"payload: {len(after):,} bytes, {leaves} pratyantardasha nodes, "
+          f"encoder: {'orjson' if orjson else 'json (orjson not installed)'}")
+    for label, fn in (("default", default_path), ("single-pass", fast_path)):
+        best, mean = best_of(fn, raw, repeats)
+        print(f"  {label:<12} best {best * 1000:7.2f} ms   mean {mean * 1000:7.2f} ms")
@@ -0,0 +1,410 @@
+# bulk.py
+# Bulk chart computation: birth records from CSV or JSONL, astrology_full
+# across a process pool, results written as JSONL or Parquet/Arrow shards.
+# A checkpoint after every shard lets a killed run resume where it stopped.
+#
+#   python bulk.py INPUT.csv|INPUT.jsonl OUT_DIR [--format jsonl|parquet|arrow]
+#                  [--workers N] [--shard-size 10000] [--chunk-size 50]
+#                  [--exclude transits,remedies]
+#
+# Input columns/keys: dob (YYYY-MM-DD), tob (HH:MM), tz (or tz_str),
+# latitude, longitude and an optional id (default: the record's position).
+# JSONL shards hold one {"id", "input", "result"} line per chart; Parquet
+# and Arrow shards are directories of charts.<ext> + dasha_periods.<ext>
+# (see exporters.ColumnarWriter). Failed records go to errors-NNNNN.jsonl.
+
+import argparse
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from config import BATCH_WORKERS
+
+FORMATS = ("jsonl", "parquet", "arrow")
+CHECKPOINT = "checkpoint.json"
+DEFAULT_SHARD_SIZE = 10000
+DEFAULT_CHUNK_SIZE = 50
+PROGRESS_SECONDS = 2.0
+
+
+# ----------------------------------------------------
+# Input
+# ----------------------------------------------------
+def _jsonl_rows(lines):
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as exc:
+            yield exc
+
+
+def _birth_kwargs(row):
+    if isinstance(row, Exception):
+        raise row
+    return {
+        "dob": str(row["dob"]).strip(),
+        "tob": str(row["tob"]).strip(),
+        "tz_str": str(row.get("tz") or row["tz_str"]).strip(),
+        "latitude": float(row["latitude"]),
+        "longitude": float(row["longitude"]),
+    }
+
+
+def read_records(path):
+    """
+    (record_id, astrology_full kwargs, error) per input record, in file
+    order; records that cannot be read come through with kwargs None.
+    """
+    path = Path(path)
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = csv.DictReader(f) if path.suffix.lower() == ".csv" else _jsonl_rows(f)
+        for index, row in enumerate(rows):
+            record_id = index
+            if isinstance(row, dict) and row.get("id") not in (None, ""):
+                record_id = row["id"]
+            try:
+                yield record_id, _birth_kwargs(row), None
+            except (AttributeError, KeyError, TypeError, ValueError) as exc:
+                yield record_id, None, f"Invalid record: {type(exc).__name__}: {exc}"
+
+
+def count_records(path):
+    """Records in `path` (for progress only): non-blank lines, less the CSV header."""
+    path = Path(path)
+    with open(path, "rb") as f:
+        lines = sum(1 for line in f if line.strip())
+    return max(lines - 1, 0) if path.suffix.lower() == ".csv" else lines
+
+
+# ----------------------------------------------------
+# Workers
+# ----------------------------------------------------
+def warm_worker():
+    """
+    Process-pool initializer: importing astrology_full loads the DE421
+    kernel and timescale once per process.
+    """
+    import astrology_full  # noqa: F401
+
+
+def _compute_chunk(records, fmt, exclude):
+    """
+    Runs in a worker: (record_id, data, error) per record, where data is
+    the finished JSONL line (bytes) or flatten_chart's rows, so only the
+    compact form crosses back to the parent process.
+    """
+    from astrology_full import AstrologyComputationError, astrology_full
+    from exporters import flatten_chart
+    from serialization import dumps
+
+    results = []
+    for record_id, kwargs, error in records:
+        if error is not None:
+            results.append((record_id, None, error))
+            continue
+        try:
+            # Every record is a new birth: skip the natal cache entirely
+            payload = astrology_full(**kwargs, use_cache=False, json_safe=False, exclude=exclude)
+        except AstrologyComputationError as exc:
+            results.append((record_id, None, str(exc)))
+            continue
+        except Exception as exc:
+            results.append((record_id, None, f"{type(exc).__name__}: {exc}"))
+            continue
+        if fmt == "jsonl":
+            data = dumps({"id": record_id, "input": kwargs, "result": payload})
+        else:
+            data = flatten_chart(str(record_id), payload)
+        results.append((record_id, data, None))
+    return results
+
+
+# ----------------------------------------------------
+# Output shards
+# ----------------------------------------------------
+class ShardWriter:
+    """
+    One output shard, written under a .tmp name and renamed into place by
+    commit(), so OUT_DIR only ever holds complete shards. Failed records
+    go to errors-NNNNN.jsonl next to it.
+    """
+
+    def __init__(self, directory, index, fmt, rows_per_batch=1000):
+        self.directory = Path(directory)
+        self.fmt = fmt
+        self.count = 0
+        self.errors = []
+        name = f"shard-{index:05d}"
+        self.final = self.directory / (name + ".jsonl" if fmt == "jsonl" else name)
+        self.errors_path = self.directory / f"errors-{index:05d}.jsonl"
+        self.tmp = self.final.with_name(self.final.name + ".tmp")
+        if fmt == "jsonl":
+            self._file = open(self.tmp, "wb")
+        else:
+            from exporters import ColumnarWriter
+
+            self._writer = ColumnarWriter(self.tmp, fmt, rows_per_batch)
+
+    def write(self, record_id, data, error):
+        self.count += 1
+        if error is not None:
+            self.errors.append({"id": record_id, "error": error})
+        elif self.fmt == "jsonl":
+            self._file.write(data + b"\n")
+        else:
+            self._writer.write_rows(*data)
+
+    def commit(self):
+        if self.fmt == "jsonl":
+            self._file.close()
+        else:
+            self._writer.close()
+        # A shard written before a crash but never checkpointed is replaced
+        if self.final.is_dir():
+            shutil.rmtree(self.final)
+        os.replace(self.tmp, self.final)
+        if self.errors:
+            with open(self.errors_path, "w", encoding="utf-8") as f:
+                for row in self.errors:
+                    f.write(json.dumps(row) + "\n")
+        elif self.errors_path.exists():
+            self.errors_path.unlink()
+
+
+def _remove_partial(directory):
+    for path in Path(directory).glob("*.tmp"):
+        if path.is_dir():
+            shutil.rmtree(path)
+        else:
+            path.unlink()
+
+
+class ShardedOutput:
+    """
+    Takes results in input order, rolls them into shards of `shard_size`
+    records and checkpoints `state` after each committed shard.
+    """
+
+    def __init__(self, directory, state, shard_size, rows_per_batch=1000):
+        self.directory = Path(directory)
+        self.state = state
+        self.shard_size = shard_size
+        self.rows_per_batch = rows_per_batch
+        self._shard = None
+
+    @property
+    def records_seen(self):
+        return self.state["records_done"] + (self._shard.count if self._shard else 0)
+
+    def write(self, record_id, data, error):
+        if self._shard is None:
+            self._shard = ShardWriter(self.directory, self.state["shards_done"], self.state["format"],
+                                      self.rows_per_batch)
+        self._shard.write(record_id, data, error)
+        self.state["ok" if error is None else "errors"] += 1
+        if self._shard.count >= self.shard_size:
+            self._commit()
+
+    def _commit(self):
+        self._shard.commit()
+        self.state["records_done"] += self._shard.count
+        self.state["shards_done"] += 1
+        save_checkpoint(self.directory, self.state)
+        self._shard = None
+
+    def close(self):
+        """Commit the last, partial shard and mark the run complete."""
+        if self._shard is not None:
+            self._commit()
+        self.state["complete"] = True
+        save_checkpoint(self.directory, self.state)
+        return self.state
+
+
+# ----------------------------------------------------
+# Checkpoint
+# ----------------------------------------------------
+def load_checkpoint(directory, settings):
+    """
+    The saved progress for OUT_DIR, or a fresh one. Resuming with a
+    different input or output settings raises ValueError, since the
+    shards already written would not match the rest.
+    """
+    path = Path(directory) / CHECKPOINT
+    if not path.exists():
+        return {**settings, "records_done": 0, "shards_done": 0, "ok": 0, "errors": 0, "complete": False}
+    state = json.loads(path.read_text(encoding="utf-8"))
+    changed = sorted(key for key, value in settings.items() if state.get(key) != value)
+    if changed:
+        raise ValueError(
+            f"{path} was written with different {', '.join(changed)}; "
+            "use a new output directory or delete it to start over."
+        )
+    return state
+
+
+def open_output(input_path, out_dir, fmt, shard_size, exclude):
+    """
+    Validate the run settings and load (or start) OUT_DIR's checkpoint,
+    clearing any shard a previous run left half-written.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format '{fmt}', expected one of {FORMATS}.")
+    if exclude:
+        from stages import select_sections
+
+        select_sections(exclude=exclude)  # unknown names raise ValueError
+
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    settings = {
+        "input": str(Path(input_path).resolve()),
+        "format": fmt,
+        "shard_size": shard_size,
+        "exclude": sorted(exclude or []),
+    }
+    state = load_checkpoint(out, settings)
+    if not state["complete"]:
+        _remove_partial(out)
+    return state
+
+
+def save_checkpoint(directory, state):
+    path = Path(directory) / CHECKPOINT
+    tmp = path.with_name(CHECKPOINT + ".tmp")
+    tmp.write_text(json.dumps(state, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+# ----------------------------------------------------
+# Run
+# ----------------------------------------------------
+def chunked(records, size):
+    """Lists of up to `size` records, pulled lazily from any iterable."""
+    records = iter(records)
+    while True:
+        chunk = list(itertools.islice(records, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def format_duration(seconds):
+    """H:MM:SS for a number of seconds."""
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+
+class Progress:
+    """Prints a throughput line at most every PROGRESS_SECONDS (stderr)."""
+
+    def __init__(self, start_done, total, enabled=True):
+        self.start_done = start_done
+        self.total = total
+        self.enabled = enabled
+        self.started = time.monotonic()
+        self.last = 0.0
+        self.end = "\r" if sys.stderr.isatty() else "\n"
+
+    def update(self, state, force=False):
+        now = time.monotonic()
+        if not self.enabled or (not force and now - self.last < PROGRESS_SECONDS):
+            return
+        self.last = now
+        done = state["records_done"]
+        elapsed = now - self.started
+        rate = (done - self.start_done) / elapsed if elapsed else 0.0
+        line = f"{done:,}/{self.total:,} records, {rate:,.1f}/s, {state['errors']:,} errors"
+        if rate and self.total > done:
+            line += f", ETA {format_duration((self.total - done) / rate)}"
+        print(line, end=self.end, file=sys.stderr, flush=True)
+
+
+def run_bulk(input_path, out_dir, fmt="jsonl", workers=BATCH_WORKERS, shard_size=DEFAULT_SHARD_SIZE,
+             chunk_size=DEFAULT_CHUNK_SIZE, exclude=None, progress=True):
+    """
+    Compute every record of `input_path` into shards of `shard_size`
+    records under `out_dir`, in input order. Chunks of `chunk_size`
+    records go to the pool, with at most two per worker outstanding, so
+    memory stays flat whatever the input size. Returns the final
+    checkpoint state.
+    """
+    exclude = sorted(exclude or [])
+    state = open_output(input_path, out_dir, fmt, shard_size, exclude)
+    if state["complete"]:
+        return state
+
+    meter = Progress(state["records_done"], count_records(input_path), progress)
+    records = itertools.islice(read_records(input_path), state["records_done"], None)
+    output = ShardedOutput(out_dir, state, shard_size)
+
+    def consume(results):
+        for result in results:
+            output.write(*result)
+        meter.update({**state, "records_done": output.records_seen})
+
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=warm_worker) as pool:
+        pending = deque()
+        try:
+            for chunk in chunked(records, chunk_size):
+                pending.append(pool.submit(_compute_chunk, chunk, fmt, exclude))
+                if len(pending) >= 2 * workers:
+                    consume(pending.popleft().result())
+            while pending:
+                consume(pending.popleft().result())
+        except BaseException:
+            # Ctrl-C or a dead worker: drop queued chunks; the checkpoint
+            # still points at the last committed shard
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    state = output.close()
+    meter.update(state, force=True)
+    if progress and meter.end == "\r":
+        print(file=sys.stderr)
+    return state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute charts for many birth records, resumably.")
+    parser.add_argument("input", help="CSV or JSONL birth records")
+    parser.add_argument("out_dir", help="shards, errors and checkpoint.json go here")
+    parser.add_argument("--format", choices=FORMATS, default="jsonl")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS)
+    parser.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE,
+                        help="records per output shard (and per checkpoint)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="records per task sent to a worker")
+    parser.add_argument("--exclude", default="", help="comma-separated sections to leave out")
+    parser.add_argument("--quiet", action="store_true", help="no progress lines")
+    args = parser.parse_args()
+
+    exclude = [name.strip() for name in args.exclude.split(",") if name.strip()]
+    started = time.monotonic()
+    try:
+        state = run_bulk(args.input, args.out_dir, args.format, args.workers, args.shard_size,
+                         args.chunk_size, exclude, not args.quiet)
+    except ValueError as exc:
+        parser.error(str(exc))
+    except KeyboardInterrupt:
+        sys.exit(f"Interrupted; run the same command again to resume from {args.out_dir}/{CHECKPOINT}.")
+
+    print(f"{state['records_done']:,} records ({state['ok']:,} ok, {state['errors']:,} errors) "
+          f"in {state['shards_done']} shards under {Path(args.out_dir).resolve()} "
+          f"[{format_duration(time.monotonic() - started)}]")
+
+
+if __name__ == "__main__":
+    main()
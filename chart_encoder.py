@@ -0,0 +1,336 @@
+"""
+Compact, token-budgeted text encoding of an astrology chart for LLM prompts.
+
+The full chart (every dasha node, every divisional dict) runs to tens of
+thousands of tokens. encode_chart renders each section as terse lines,
+in priority order, and drops to a shorter variant -- or leaves the
+section out -- once the budget runs low:
+
+    text, report = encode_chart(chart, budget_tokens=600, when=datetime(2025, 1, 1))
+
+Output depends only on the chart, the budget and `when`, so the same
+inputs always give the same text. Token counts are estimates (about four
+characters per token), not a tokenizer's exact figure.
+"""
+
+from __future__ import annotations
+
+import math
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import SIGNS, TITHIS, YOGAS
+from dasha import DASHA_LEVELS, MAX_DASHA_DEPTH, dasha_at
+
+CHARS_PER_TOKEN = 4
+PLANET_ORDER = ("Sun", "Moon", "Mars", "Mercury", "Jupiter", "Venus", "Saturn")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for English/ASCII prompt text."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _degree(longitude: float) -> str:
+    """Position within the sign as D°MM'."""
+    within = longitude % 30.0
+    degrees = int(within)
+    minutes = int(round((within - degrees) * 60))
+    if minutes == 60:
+        degrees, minutes = degrees + 1, 0
+    return f"{degrees}°{minutes:02d}'"
+
+
+def _abbr(sign: str) -> str:
+    return sign[:3]
+
+
+def _date(value: Any) -> str:
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d")
+    return str(value)[:10]
+
+
+def _birth_datetime(chart: Dict[str, Any]) -> Optional[datetime]:
+    meta = chart.get("meta", {})
+    if not meta.get("dob") or not meta.get("tob"):
+        return None
+    return datetime.strptime(meta["dob"] + " " + meta["tob"], "%Y-%m-%d %H:%M")
+
+
+def _strength_flags(chart: Dict[str, Any]) -> Dict[str, List[str]]:
+    flags: Dict[str, List[str]] = {}
+    for row in chart.get("strengths", []):
+        names = [
+            label
+            for key, label in (
+                ("is_exalted", "exalted"),
+                ("is_debilitated", "debilitated"),
+                ("is_retrograde", "retro"),
+                ("is_combust", "combust"),
+            )
+            if row.get(key)
+        ]
+        flags[row["planet"]] = names
+    return flags
+
+
+# ----------------------------------------------------
+# Section encoders: chart -> [full text, shorter text, ...] (empty: nothing to say)
+# ----------------------------------------------------
+def _encode_birth(chart: Dict[str, Any], when: datetime) -> List[str]:
+    meta = chart.get("meta", {})
+    lagna = chart.get("lagna", {})
+    moon = chart.get("moon", {})
+    nakshatra = moon.get("nakshatra") or {}
+    lines = []
+    if meta:
+        birth = f"Birth: {meta.get('dob')} {meta.get('tob')} {meta.get('timezone')}"
+        if meta.get("latitude") is not None and meta.get("longitude") is not None:
+            birth += f" @ {meta['latitude']:.2f},{meta['longitude']:.2f}"
+        lines.append(birth)
+    if lagna:
+        lines.append(f"Lagna: {SIGNS[lagna['sign_index']]} {_degree(lagna['degree'])}")
+    if moon:
+        lines.append(
+            f"Moon: {SIGNS[int(moon['sidereal'] // 30)]} {_degree(moon['sidereal'])}, "
+            f"{nakshatra.get('nakshatra')} pada {nakshatra.get('pada')}"
+        )
+    if chart.get("ayanamsa") is not None:
+        lines.append(f"Ayanamsa: {chart['ayanamsa']:.4f}")
+    if not lines:
+        return []
+    return ["\n".join(lines), "\n".join(lines[:3])]
+
+
+def _encode_planets(chart: Dict[str, Any], when: datetime) -> List[str]:
+    placements = chart.get("rasi_chart", {}).get("planets", {})
+    if not placements:
+        return []
+    flags = _strength_flags(chart)
+    divisional = chart.get("divisional", {})
+    full, short = ["Planets (sign deg house | D9):"], ["Planets:"]
+    for name in PLANET_ORDER:
+        p = placements.get(name)
+        if p is None:
+            continue
+        d9 = divisional.get(name, {}).get("D9", {}).get("d9_sign")
+        extra = " " + ",".join(flags[name]) if flags.get(name) else ""
+        full.append(
+            f"{name} {p['sign']} {_degree(p['longitude'])} h{p['house']}"
+            + (f" | D9 {d9}" if d9 else "") + extra
+        )
+        short.append(f"{name[:2]} {_abbr(p['sign'])}{int(p['longitude'] % 30)} h{p['house']}")
+    return ["\n".join(full), short[0] + " " + "; ".join(short[1:])]
+
+
+def _next_period(moon: float, birth: datetime, current: Dict[str, Any], depth: int) -> Optional[Dict]:
+    at = current["end"]
+    for _ in range(depth):
+        following = dasha_at(moon, birth, at, depth)
+        if len(following) == depth:
+            return following[-1]
+        if not following:
+            return None
+        # `at` fell in the days a parent keeps after its sub-periods: move to the next parent
+        at = following[-1]["end"]
+    return None
+
+
+def _dasha_periods(chart: Dict[str, Any], when: datetime) -> List[Tuple[Dict, Optional[Dict]]]:
+    """(current, next) period pairs at each level, outermost first."""
+    birth = _birth_datetime(chart)
+    moon = chart.get("moon", {}).get("sidereal")
+    if birth is None or moon is None:
+        return []
+    return [
+        (current, _next_period(moon, birth, current, level + 1))
+        for level, current in enumerate(dasha_at(moon, birth, when, MAX_DASHA_DEPTH))
+    ]
+
+
+def _period_label(period: Dict[str, Any]) -> str:
+    return "/".join(period[level] for level in DASHA_LEVELS if level in period)
+
+
+def _encode_dasha(chart: Dict[str, Any], when: datetime) -> List[str]:
+    pairs = _dasha_periods(chart, when)
+    balance = chart.get("dasha", {}).get("balance", {})
+    head = f"Vimshottari dasha on {when:%Y-%m-%d}"
+    if balance:
+        head += f" (birth balance {balance.get('starting_mahadasha')} {balance.get('remaining_years_exact', 0):.2f}y)"
+    if not pairs:
+        return [head + ": outside the 120-year cycle"] if balance else []
+
+    full = [head + ":"]
+    for current, nxt in pairs:
+        line = f"{_period_label(current)} {_date(current['start'])}..{_date(current['end'])}"
+        if nxt is not None:
+            line += f"; next {_period_label(nxt)} to {_date(nxt['end'])}"
+        full.append(line)
+    current, nxt = pairs[-1]
+    short = f"Dasha {when:%Y-%m-%d}: {_period_label(current)} to {_date(current['end'])}"
+    if len(pairs) > 1 and pairs[0][1] is not None:
+        short += f"; next MD {pairs[0][1][DASHA_LEVELS[0]]} {_date(pairs[0][1]['start'])}"
+    return ["\n".join(full), short]
+
+
+def _encode_yogas(chart: Dict[str, Any], when: datetime) -> List[str]:
+    if "yogas" not in chart:
+        return []
+    yogas = chart["yogas"]
+    names = yogas.get("yogas", []) if isinstance(yogas, dict) else list(yogas)
+    text = "Yogas: " + (", ".join(sorted(names)) if names else "none detected")
+    kemadruma = (yogas.get("diagnostics", {}) if isinstance(yogas, dict) else {}).get("kemadruma", {})
+    if kemadruma.get("kemadruma") and kemadruma.get("reason"):
+        return [text + f" (Kemadruma: {kemadruma['reason']})", text]
+    return [text]
+
+
+def _encode_strengths(chart: Dict[str, Any], when: datetime) -> List[str]:
+    rows = chart.get("strengths")
+    if not rows:
+        return []
+    flags = _strength_flags(chart)
+    marked = [f"{name} {'+'.join(flags[name])}" for name in PLANET_ORDER if flags.get(name)]
+    order = {name: i for i, name in enumerate(PLANET_ORDER)}
+    scored = sorted(rows, key=lambda r: (-r.get("raw_score", 0), order.get(r["planet"], len(order))))
+    scores = ", ".join(f"{r['planet']} {r.get('raw_score', 0):g}" for r in scored)
+    summary = "Strengths: " + ("; ".join(marked) if marked else "no exalted/debilitated/retro/combust planets")
+    return [summary + f"\nScores: {scores}", summary]
+
+
+def _encode_transits(chart: Dict[str, Any], when: datetime) -> List[str]:
+    transits = chart.get("transits")
+    if not transits:
+        return []
+    current = transits.get("current", {})
+    sade_sati = transits.get("sade_sati", {})
+    sade = f"Sade Sati: {sade_sati.get('phase')}" if sade_sati.get("phase") else "Sade Sati: no"
+    positions = "; ".join(
+        f"{name[:2]} {_abbr(SIGNS[int(current[name] // 30)])}{int(current[name] % 30)}"
+        for name in PLANET_ORDER if name in current
+    )
+    return [f"Transits now: {positions}\n{sade}", sade]
+
+
+def _encode_panchanga(chart: Dict[str, Any], when: datetime) -> List[str]:
+    panchanga = chart.get("panchanga")
+    if not panchanga:
+        return []
+    tithi, yoga = panchanga.get("tithi"), panchanga.get("yoga")
+    parts = []
+    if tithi is not None:
+        parts.append(f"tithi {TITHIS[tithi % len(TITHIS)]}")
+    if yoga is not None:
+        parts.append(f"yoga {YOGAS[yoga % len(YOGAS)]}")
+    if panchanga.get("karana") is not None:
+        parts.append(f"karana #{panchanga['karana']}")
+    return ["Panchanga: " + ", ".join(parts)]
+
+
+def _encode_divisional(chart: Dict[str, Any], when: datetime) -> List[str]:
+    divisional = chart.get("divisional")
+    if not divisional:
+        return []
+    full, short = ["Divisional (D9 D10 D7):"], []
+    for name in PLANET_ORDER:
+        charts = divisional.get(name)
+        if not charts:
+            continue
+        signs = [charts.get(d, {}).get(f"{d.lower()}_sign", "?") for d in ("D9", "D10", "D7")]
+        full.append(f"{name} " + " ".join(signs))
+        short.append(f"{name[:2]} {_abbr(signs[1])}")
+    return ["\n".join(full), "D10: " + "; ".join(short)]
+
+
+def _encode_remedies(chart: Dict[str, Any], when: datetime) -> List[str]:
+    remedies = chart.get("remedies")
+    if not remedies:
+        return []
+    full = ["Remedies:"] + [
+        f"{r['planet']}: {r['remedy'].get('mantra')}, {r['remedy'].get('gemstone')}, "
+        f"{r['remedy'].get('color')}, {r['remedy'].get('donation')}"
+        for r in remedies
+    ]
+    short = "Remedies: " + "; ".join(f"{r['planet']} {r['remedy'].get('gemstone')}" for r in remedies)
+    return ["\n".join(full), short]
+
+
+# Priority order: earlier sections are placed first and kept longest
+SECTION_ENCODERS: Dict[str, Callable[[Dict[str, Any], datetime], List[str]]] = {
+    "birth": _encode_birth,
+    "dasha": _encode_dasha,
+    "planets": _encode_planets,
+    "yogas": _encode_yogas,
+    "strengths": _encode_strengths,
+    "transits": _encode_transits,
+    "panchanga": _encode_panchanga,
+    "divisional": _encode_divisional,
+    "remedies": _encode_remedies,
+}
+VARIANTS = ("full", "short")
+
+
+def encode_chart(
+    chart: Dict[str, Any], budget_tokens: int, when: Optional[datetime] = None
+) -> Tuple[str, Dict[str, Dict[str, Any]]]:
+    """
+    Fit sections into `budget_tokens` in two passes over SECTION_ENCODERS
+    order: first each section's shortest variant (omitted if it does not
+    fit), then upgrades to the longest variant the remaining budget allows.
+    `when` (naive local time, default now) picks the current and next
+    dasha periods; pass it explicitly for reproducible output.
+
+    Returns (text, report) where report maps every section to
+    {"variant": "full" | "short" | "omitted" | "empty", "tokens": int,
+     "full_tokens": int} -- tokens actually spent vs the full rendering.
+    """
+    if when is None:
+        when = datetime.now()
+    encoded = {name: encoder(chart, when) for name, encoder in SECTION_ENCODERS.items()}
+    sizes = {
+        name: [estimate_tokens(text) + 1 for text in variants]  # +1: separating newline
+        for name, variants in encoded.items()
+    }
+    chosen: Dict[str, int] = {}  # section -> index into its variants
+    remaining = budget_tokens
+
+    for name, variants in encoded.items():
+        if variants and sizes[name][-1] <= remaining:
+            chosen[name] = len(variants) - 1
+            remaining -= sizes[name][-1]
+    for name, index in chosen.items():
+        for better in range(index):
+            extra = sizes[name][better] - sizes[name][index]
+            if extra <= remaining:
+                chosen[name] = better
+                remaining -= extra
+                break
+
+    report: Dict[str, Dict[str, Any]] = {}
+    blocks: List[str] = []
+    for name, variants in encoded.items():
+        if not variants:
+            report[name] = {"variant": "empty", "tokens": 0, "full_tokens": 0}
+        elif name not in chosen:
+            report[name] = {"variant": "omitted", "tokens": 0, "full_tokens": sizes[name][0]}
+        else:
+            index = chosen[name]
+            blocks.append(variants[index])
+            report[name] = {
+                "variant": VARIANTS[index],
+                "tokens": sizes[name][index],
+                "full_tokens": sizes[name][0],
+            }
+    return "\n".join(blocks), report
+
+
+def format_report(report: Dict[str, Dict[str, Any]], budget_tokens: int) -> str:
+    """Human-readable per-section size table for the CLI."""
+    lines = [f"{'section':<12} {'variant':<8} {'tokens':>7} {'full':>7}"]
+    for name, entry in report.items():
+        lines.append(f"{name:<12} {entry['variant']:<8} {entry['tokens']:>7} {entry['full_tokens']:>7}")
+    used = sum(entry["tokens"] for entry in report.values())
+    lines.append(f"{'total':<12} {'':<8} {used:>7} {budget_tokens:>7} (budget)")
+    return "\n".join(lines)
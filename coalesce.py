@@ -0,0 +1,50 @@
+# coalesce.py
+# Single-flight de-duplication: identical concurrent requests share one computation.
+
+import asyncio
+
+
+class SingleFlight:
+    """
+    At most one in-flight computation per key. The first caller (leader)
+    starts it as its own task; callers arriving with the same key before
+    it finishes (followers) await that task and get the same result or
+    exception. A caller disconnecting does not cancel the shared work.
+
+    Used from a single event loop, so no locking is needed.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def do(self, key, fn, *args, **kwargs):
+        task = self._inflight.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.followers += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # retrieved here so an abandoned failure is not logged as unhandled
+
+    def stats(self):
+        calls = self.leaders + self.followers
+        return {
+            "leaders": self.leaders,
+            "followers": self.followers,
+            "coalescing_ratio": self.followers / calls if calls else 0.0,
+            "in_flight": len(self._inflight),
+        }
+
+
+# Shared by the /astrology endpoint
+astrology_flights = SingleFlight()
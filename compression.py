@@ -0,0 +1,71 @@
+# compression.py
+# Accept-Encoding negotiation and gzip/brotli compression of finished responses.
+
+import gzip
+
+try:  # optional: pip install brotli
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+from config import COMPRESS_BROTLI_QUALITY, COMPRESS_GZIP_LEVEL, COMPRESS_MIN_BYTES
+
+# Server preference when the client accepts several equally
+ENCODINGS = (("br",) if brotli is not None else ()) + ("gzip",)
+
+
+def choose_encoding(accept_encoding):
+    """Best supported coding for an Accept-Encoding header, or None for identity."""
+    offered = {}
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        offered[coding] = q
+
+    best, best_q = None, 0.0
+    for coding in ENCODINGS:
+        q = offered.get(coding, offered.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(body, coding):
+    if coding == "br":
+        return brotli.compress(body, quality=COMPRESS_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=COMPRESS_GZIP_LEVEL, mtime=0)
+
+
+def compress_response(response, accept_encoding, minimum_size=COMPRESS_MIN_BYTES):
+    """
+    Compress a fully rendered Response in place when its body is at least
+    `minimum_size` bytes (negative: never) and the client accepts gzip or
+    brotli. A strong ETag becomes weak, since the bytes are no longer the
+    ones it was computed over.
+    """
+    response.headers["Vary"] = "Accept-Encoding"
+    body = response.body
+    if minimum_size < 0 or len(body) < minimum_size or "content-encoding" in response.headers:
+        return response
+
+    coding = choose_encoding(accept_encoding)
+    if coding is None:
+        return response
+
+    response.body = compress(body, coding)
+    response.headers["Content-Encoding"] = coding
+    response.headers["Content-Length"] = str(len(response.body))
+    etag = response.headers.get("etag")
+    if etag and not etag.startswith("W/"):
+        response.headers["ETag"] = "W/" + etag
+    return response
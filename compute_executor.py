@@ -0,0 +1,157 @@
+# compute_executor.py
+# Dedicated, bounded executor for chart computations with fast rejection when full.
+
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from config import COMPUTE_EXECUTOR, COMPUTE_MAX_QUEUE, COMPUTE_WORKERS
+
+
+class ExecutorSaturated(RuntimeError):
+    """Raised when every worker is busy and the wait queue is full."""
+    pass
+
+
+def _timed_call(submitted, fn, kwargs):
+    # Runs in the worker; wall clock so the wait is comparable across processes
+    waited = time.time() - submitted
+    result = fn(**kwargs)
+    # A process worker filled a copy of `timings`; send it back with the result
+    return waited, result, kwargs.get("timings")
+
+
+def _warm_worker():
+    import astrology_full  # noqa: F401
+
+
+class Admission:
+    """A slot held in a BoundedExecutor; release() is idempotent."""
+
+    def __init__(self, executor):
+        self._executor = executor
+        self._released = False
+
+    def release(self):
+        with self._executor._lock:
+            if self._released:
+                return
+            self._released = True
+            self._executor.in_flight -= 1
+
+
+class BoundedExecutor:
+    """
+    Runs blocking computations on `workers` threads or processes and admits
+    at most `max_queue` more jobs waiting behind them. Anything beyond that
+    raises ExecutorSaturated immediately instead of queueing invisibly.
+
+    A `timings` keyword (metrics.Timings) is passed through to `fn`, filled
+    in the caller's copy even in process mode, and gets the queue wait as
+    "queue".
+
+    Work that cannot be handed to `fn` whole (a streamed response) takes a
+    slot with admit() and releases it when done, so it counts against the
+    same capacity.
+    """
+
+    def __init__(self, kind="thread", workers=4, max_queue=64):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown executor kind '{kind}', expected 'thread' or 'process'.")
+        self.kind = kind
+        self.workers = workers
+        self.max_queue = max_queue
+
+        self._executor = None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.wait_last = 0.0
+
+    @property
+    def capacity(self):
+        return self.workers + self.max_queue
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_warm_worker,
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="compute"
+                )
+        return self._executor
+
+    def _acquire(self):
+        with self._lock:
+            if self.in_flight >= self.capacity:
+                self.rejected += 1
+                raise ExecutorSaturated(
+                    f"Compute queue full ({self.in_flight} in flight, capacity {self.capacity})."
+                )
+            self.in_flight += 1
+
+    def admit(self):
+        self._acquire()
+        return Admission(self)
+
+    async def run(self, fn, **kwargs):
+        self._acquire()
+
+        try:
+            loop = asyncio.get_running_loop()
+            waited, result, timings = await loop.run_in_executor(
+                self._get_executor(), _timed_call, time.time(), fn, kwargs
+            )
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+        with self._lock:
+            self.completed += 1
+            self.wait_total += waited
+            self.wait_last = waited
+            self.wait_max = max(self.wait_max, waited)
+
+        if timings is not None:
+            if timings is not kwargs["timings"]:
+                kwargs["timings"].update(timings)
+            kwargs["timings"]["queue"] = waited
+        return result
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "kind": self.kind,
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "in_flight": self.in_flight,
+                "queue_depth": max(0, self.in_flight - self.workers),
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "wait_seconds_avg": self.wait_total / self.completed if self.completed else 0.0,
+                "wait_seconds_max": self.wait_max,
+                "wait_seconds_last": self.wait_last,
+            }
+
+
+# Process-wide executor used by the /astrology endpoint
+compute_executor = BoundedExecutor(
+    kind=COMPUTE_EXECUTOR,
+    workers=COMPUTE_WORKERS,
+    max_queue=COMPUTE_MAX_QUEUE,
+)
@@ -1,6 +1,8 @@
 # config.py
 # Core configuration and static tables for Vedic Astrology Engine
 
+import os
+
 # 12 Zodiac Signs (Sidereal)
 SIGNS = [
     "Aries", "Taurus", "Gemini", "Cancer", "Leo", "Virgo",
@@ -69,3 +71,56 @@ KARANAS = [
     "Bava", "Balava", "Kaulava", "Taitila", "Garaja",
     "Vanija", "Vishti", "Shakuni", "Chatushpada", "Naga", "Kimstughna"
 ]
+
+
+# ----------------------------------------------------
+# Runtime settings (override with environment variables)
+# ----------------------------------------------------
+
+# Directory written by `python ephemeris_table.py build`; empty = Skyfield only
+EPHEMERIS_TABLE_DIR = os.environ.get("EPHEMERIS_TABLE_DIR", "")
+
+# Shared transit snapshots: one computation per time bucket and lat/lon tile
+TRANSIT_BUCKET_SECONDS = int(os.environ.get("TRANSIT_BUCKET_SECONDS", "60"))
+TRANSIT_TTL_SECONDS = int(os.environ.get("TRANSIT_TTL_SECONDS", "300"))
+TRANSIT_TILE_DEGREES = float(os.environ.get("TRANSIT_TILE_DEGREES", "1.0"))
+TRANSIT_REFRESH = os.environ.get("TRANSIT_REFRESH", "1") == "1"
+
+# /astrology/batch: worker processes (default: one per core) and items per call
+BATCH_WORKERS = int(os.environ.get("BATCH_WORKERS", "0")) or os.cpu_count() or 1
+BATCH_MAX_ITEMS = int(os.environ.get("BATCH_MAX_ITEMS", "100"))
+
+# /astrology compute executor ("thread" or "process"); requests beyond
+# workers + max queue get 503 with Retry-After
+COMPUTE_EXECUTOR = os.environ.get("COMPUTE_EXECUTOR", "thread")
+COMPUTE_WORKERS = int(os.environ.get("COMPUTE_WORKERS", "0")) or os.cpu_count() or 1
+COMPUTE_MAX_QUEUE = int(os.environ.get("COMPUTE_MAX_QUEUE", "64"))
+COMPUTE_RETRY_AFTER = int(os.environ.get("COMPUTE_RETRY_AFTER", "1"))
+
+# Natal result cache: in-process LRU plus optional SQLite file shared by workers
+NATAL_CACHE_SIZE = int(os.environ.get("NATAL_CACHE_SIZE", "1024"))
+NATAL_CACHE_TTL = int(os.environ.get("NATAL_CACHE_TTL", "86400"))
+NATAL_CACHE_DB = os.environ.get("NATAL_CACHE_DB", "")
+NATAL_CACHE_ROUND = int(os.environ.get("NATAL_CACHE_ROUND", "4"))
+
+# "1" = encode /astrology responses in one pass with orjson (serialization.py)
+FAST_JSON = os.environ.get("FAST_JSON", "0") == "1"
+
+# "1" = add a Server-Timing header with per-stage durations to /astrology responses
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "0") == "1"
+
+# /astrology?profile=pstats|collapsed needs this in X-Profile-Token; empty = disabled.
+# Profiles are also written to PROFILE_DIR when set.
+PROFILE_TOKEN = os.environ.get("PROFILE_TOKEN", "")
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "")
+
+# "1" = identical concurrent /astrology payloads share one computation
+COALESCE_REQUESTS = os.environ.get("COALESCE_REQUESTS", "1") == "1"
+
+# Cache-Control max-age (seconds) for /astrology/chart with dasha_expand=all; revalidated via ETag after
+CHART_MAX_AGE = int(os.environ.get("CHART_MAX_AGE", "3600"))
+
+# gzip/brotli for /astrology and /astrology/chart bodies of at least this many bytes (-1 = off)
+COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", "1024"))
+COMPRESS_GZIP_LEVEL = int(os.environ.get("COMPRESS_GZIP_LEVEL", "6"))
+COMPRESS_BROTLI_QUALITY = int(os.environ.get("COMPRESS_BROTLI_QUALITY", "5"))
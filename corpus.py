@@ -0,0 +1,33 @@
+# corpus.py
+# Seeded birth-input corpus shared by bench.py and loadtest.py. Importing
+# it has no side effects (no environment changes, no ephemeris load).
+
+import random
+from datetime import datetime, timedelta
+
+DEFAULT_SEED = 1977
+DEFAULT_SIZE = 40
+
+TIMEZONES = [
+    "Asia/Kolkata", "UTC", "Europe/London", "America/New_York", "America/Los_Angeles",
+    "America/Sao_Paulo", "Africa/Johannesburg", "Asia/Tokyo", "Australia/Sydney",
+    "Pacific/Auckland",
+]
+
+
+def make_corpus(size=DEFAULT_SIZE, seed=DEFAULT_SEED):
+    """Deterministic birth inputs spread over 1900-2049, latitudes and timezones."""
+    rng = random.Random(seed)
+    first = datetime(1900, 1, 1)
+    span_days = (datetime(2049, 12, 31) - first).days
+    corpus = []
+    for _ in range(size):
+        dt = first + timedelta(days=rng.randrange(span_days), minutes=rng.randrange(24 * 60))
+        corpus.append({
+            "dob": dt.strftime("%Y-%m-%d"),
+            "tob": dt.strftime("%H:%M"),
+            "tz_str": rng.choice(TIMEZONES),
+            "latitude": round(rng.uniform(-60.0, 66.0), 4),
+            "longitude": round(rng.uniform(-180.0, 180.0), 4),
+        })
+    return corpus
@@ -1,7 +1,12 @@
 # dasha.py
-# Full Vimshottari Dasha calculator (Mahadasha, Antardasha, Pratyantardasha)
+# Full Vimshottari Dasha calculator (Mahadasha, Antardasha, Pratyantardasha,
+# Sookshma and Prana)
 
+from bisect import bisect_right
 from datetime import datetime, timedelta
+from functools import lru_cache
+
+import numpy as np
 
 # Vimshottari Dasha order
 DASHA_ORDER = ["Ketu", "Venus", "Sun", "Moon", "Mars", "Rahu", "Jupiter", "Saturn", "Mercury"]
@@ -112,55 +117,135 @@ def get_dasha_balance_at_birth_mini(birth_dt, lord):
 
 
 # ---------------------------------------------------
-# Antardasha (sub-periods)
+# Generic sub-periods (Antardasha, Pratyantardasha, ...)
 # ---------------------------------------------------
-def compute_antardashas(maha_lord, start, end):
-    result = []
+# Tree levels, outermost first; each name is also the period dict key
+DASHA_LEVELS = ["mahadasha", "antardasha", "pratyantardasha", "sookshma", "prana"]
 
-    total_days = (end - start).days
-    maha_years = DASHA_YEARS[maha_lord]
+# Deepest level the nested tree is built to (9 ** 3 = 729 leaves); go deeper
+# with iter_dasha_periods, which never materialises the tree
+MAX_DASHA_DEPTH = 3
 
-    for lord in DASHA_ORDER:
-        antar_fraction = DASHA_YEARS[lord] / 120.0
-        dur_days = int(total_days * antar_fraction)
+# Sookshma and Prana last days or hours, so from this level down sub-periods
+# keep fractional days instead of being cut to whole days (which left most
+# Prana periods zero-length); each level's children then fill it exactly
+FRACTIONAL_LEVEL = 3
 
-        antar_start = start if not result else result[-1]["end"]
-        antar_end = antar_start + timedelta(days=dur_days)
 
-        result.append({
-            "mahadasha": maha_lord,
-            "antardasha": lord,
-            "start": antar_start,
-            "end": antar_end
-        })
+def compute_sub_periods(parent_lords, start, end):
+    """
+    Split the period [start, end) into its 9 sub-periods.
+    parent_lords: {"mahadasha": lord, ...} for every level above the new one.
+    """
+    level = DASHA_LEVELS[len(parent_lords)]
+    result = []
+
+    if len(parent_lords) >= FRACTIONAL_LEVEL:
+        lengths = _sub_period_days((end - start) / timedelta(days=1), len(parent_lords))
+    else:
+        lengths = _sub_period_days((end - start).days)
+
+    for lord, dur_days in zip(DASHA_ORDER, lengths):
+        sub_start = start if not result else result[-1]["end"]
+        sub_end = sub_start + timedelta(days=dur_days)
+        if lord == DASHA_ORDER[-1] and len(parent_lords) >= FRACTIONAL_LEVEL:
+            sub_end = end
+
+        period = dict(parent_lords)
+        period[level] = lord
+        period["start"] = sub_start
+        period["end"] = sub_end
+        result.append(period)
 
     return result
 
 
 # ---------------------------------------------------
-# Pratyantardasha (sub-sub-periods)
+# Antardasha (sub-periods)
 # ---------------------------------------------------
-def compute_pratyantardashas(maha_lord, antar_lord, start, end):
-    result = []
+def compute_antardashas(maha_lord, start, end):
+    return compute_sub_periods({"mahadasha": maha_lord}, start, end)
 
-    total_days = (end - start).days
 
-    for lord in DASHA_ORDER:
-        frac = DASHA_YEARS[lord] / 120.0
-        dur_days = int(total_days * frac)
+# ---------------------------------------------------
+# Pratyantardasha (sub-sub-periods)
+# ---------------------------------------------------
+def compute_pratyantardashas(maha_lord, antar_lord, start, end):
+    return compute_sub_periods(
+        {"mahadasha": maha_lord, "antardasha": antar_lord}, start, end
+    )
 
-        p_start = start if not result else result[-1]["end"]
-        p_end = p_start + timedelta(days=dur_days)
 
-        result.append({
-            "mahadasha": maha_lord,
-            "antardasha": antar_lord,
-            "pratyantardasha": lord,
-            "start": p_start,
-            "end": p_end
-        })
+# ---------------------------------------------------
+# Lazy tree
+# ---------------------------------------------------
+class DashaNode:
+    """
+    One period of the Vimshottari tree. Children are computed the first
+    time they are accessed, so walking only the running branch costs
+    9 periods per level instead of 9 ** depth.
+    """
 
-    return result
+    __slots__ = ("period", "level", "_children")
+
+    def __init__(self, period, level=0):
+        self.period = period
+        self.level = level
+        self._children = None
+
+    @property
+    def lord(self):
+        return self.period[DASHA_LEVELS[self.level]]
+
+    @property
+    def children(self):
+        if self._children is None:
+            if self.level + 1 >= len(DASHA_LEVELS):
+                self._children = []
+            else:
+                lords = {k: self.period[k] for k in DASHA_LEVELS[: self.level + 1]}
+                self._children = [
+                    DashaNode(p, self.level + 1)
+                    for p in compute_sub_periods(lords, self.period["start"], self.period["end"])
+                ]
+        return self._children
+
+    def contains(self, when):
+        return self.period["start"] <= when < self.period["end"]
+
+    def to_dict(self, depth, current=None):
+        """
+        Nested JSON shape of build_full_dasha_tree, cut at `depth` levels.
+        Mahadasha and Antardasha nodes are always
+        {"<level>": period, "<child level>s": [...]}, with an empty child
+        list when not expanded; Pratyantardashas, the tree's leaf level,
+        are plain period dicts. With `current` set, only periods containing
+        that datetime are expanded.
+        """
+        if self.level + 1 >= MAX_DASHA_DEPTH:
+            return self.period
+
+        expand = self.level + 1 < depth and (current is None or self.contains(current))
+        child_key = DASHA_LEVELS[self.level + 1] + "s"
+        return {
+            DASHA_LEVELS[self.level]: self.period,
+            child_key: [child.to_dict(depth, current) for child in self.children] if expand else [],
+        }
+
+
+def lazy_dasha_tree(starting_lord, birth_dt):
+    """Mahadasha nodes; deeper levels expand on access."""
+    return [DashaNode(md) for md in compute_mahadashas(starting_lord, birth_dt)]
+
+
+def build_dasha_tree(starting_lord, birth_dt, depth=MAX_DASHA_DEPTH, current=None):
+    """
+    depth: 1 = Mahadasha only ... MAX_DASHA_DEPTH = down to Pratyantardasha.
+    current: optional datetime; if given, only the running periods are expanded.
+    """
+    if not 1 <= depth <= MAX_DASHA_DEPTH:
+        raise ValueError(f"Dasha depth must be between 1 and {MAX_DASHA_DEPTH}, got {depth}.")
+    return [node.to_dict(depth, current) for node in lazy_dasha_tree(starting_lord, birth_dt)]
 
 
 # ---------------------------------------------------
@@ -181,31 +266,214 @@ def build_full_dasha_tree(starting_lord, birth_dt, moon_sidereal):
        }
     ]
     """
-    md_list = compute_mahadashas(starting_lord, birth_dt)
+    return build_dasha_tree(starting_lord, birth_dt, MAX_DASHA_DEPTH)
 
-    full = []
 
-    for md in md_list:
-        maha_lord = md["mahadasha"]
-        antars = compute_antardashas(maha_lord, md["start"], md["end"])
+# ---------------------------------------------------
+# Streaming periods (any depth, optional time window)
+# ---------------------------------------------------
+def iter_dasha_periods(starting_lord, birth_dt, depth=len(DASHA_LEVELS),
+                       window_start=None, window_end=None):
+    """
+    Yield period dicts depth-first (each parent right before its children),
+    down to `depth` levels (5 = Prana, 59,049 leaves). With a window, only
+    periods overlapping [window_start, window_end) are yielded and subtrees
+    outside it are never generated, so memory stays O(depth).
+    """
+    if not 1 <= depth <= len(DASHA_LEVELS):
+        raise ValueError(f"Dasha depth must be between 1 and {len(DASHA_LEVELS)}, got {depth}.")
+
+    lo = -float("inf") if window_start is None else (window_start - birth_dt) / timedelta(days=1)
+    hi = float("inf") if window_end is None else (window_end - birth_dt) / timedelta(days=1)
+
+    def walk(lords_above, start_day, parent_end, lengths, level):
+        for lord, length in zip(DASHA_ORDER, lengths):
+            end_day = start_day + length
+            if lord == DASHA_ORDER[-1] and level >= FRACTIONAL_LEVEL:
+                end_day = parent_end
+            if end_day > lo and start_day < hi:
+                period = dict(lords_above)
+                period[DASHA_LEVELS[level]] = lord
+                period["start"] = birth_dt + timedelta(days=start_day)
+                period["end"] = birth_dt + timedelta(days=end_day)
+                yield period
+                if level + 1 < depth:
+                    lords = {k: period[k] for k in DASHA_LEVELS[: level + 1]}
+                    yield from walk(lords, start_day, end_day, _sub_period_days(end_day - start_day, level + 1),
+                                    level + 1)
+            start_day = end_day
+
+    md_day = 0
+    for md in compute_mahadashas(starting_lord, birth_dt):
+        length = (md["end"] - md["start"]).days
+        if md_day + length > lo and md_day < hi:
+            yield md
+            if depth > 1:
+                yield from walk({"mahadasha": md["mahadasha"]}, md_day, md_day + length,
+                                _sub_period_days(length), 1)
+        md_day += length
 
-        antar_list = []
-        for ad in antars:
-            praty = compute_pratyantardashas(
-                maha_lord,
-                ad["antardasha"],
-                ad["start"],
-                ad["end"],
-            )
 
-            antar_list.append({
-                "antardasha": ad,
-                "pratyantardashas": praty
-            })
+# ---------------------------------------------------
+# Point-in-time query (no tree)
+# ---------------------------------------------------
+# Every boundary down to Pratyantardasha is birth_dt + a whole number of days
+# (deeper ones a fractional number), and each period's sub-period lengths
+# depend only on its own length in days, so the running period can be found
+# with cumulative offsets and a bisect per level.
+_REFERENCE_DT = datetime(2000, 1, 1)
+_SUB_FRACTIONS = np.array([DASHA_YEARS[lord] / 120.0 for lord in DASHA_ORDER])
 
-        full.append({
-            "mahadasha": md,
-            "antardashas": antar_list
-        })
 
-    return full
+def _starting_lord_index(moon_sidereal_deg):
+    return int(moon_sidereal_deg // (360 / 27)) % 9
+
+
+@lru_cache(maxsize=None)
+def _mahadasha_days(start_index):
+    """Mahadasha lengths in days, in running order, for a starting lord."""
+    mds = compute_mahadashas(DASHA_ORDER[start_index], _REFERENCE_DT)
+    return tuple((md["end"] - md["start"]).days for md in mds)
+
+
+@lru_cache(maxsize=None)
+def _mahadasha_terms(start_index):
+    """The years/months/days keys compute_mahadashas puts on each Mahadasha, in running order."""
+    mds = compute_mahadashas(DASHA_ORDER[start_index], _REFERENCE_DT)
+    return tuple({k: md[k] for k in ("years", "months", "days") if k in md} for md in mds)
+
+
+def _sub_period_days(total_days, level=1):
+    """
+    Sub-period lengths in days (DASHA_ORDER order) of a period of
+    total_days, for sub-periods at `level`: whole days above
+    FRACTIONAL_LEVEL, exact fractions from it down.
+    """
+    if level >= FRACTIONAL_LEVEL:
+        return tuple(total_days * fraction for fraction in _SUB_FRACTIONS.tolist())
+    return _whole_sub_period_days(int(total_days))
+
+
+@lru_cache(maxsize=None)
+def _whole_sub_period_days(total_days):
+    return tuple(int(total_days * (DASHA_YEARS[lord] / 120.0)) for lord in DASHA_ORDER)
+
+
+def _boundaries(start_day, days, end_day=None):
+    """
+    Start day of each period followed by the end of the last, accumulated
+    the same way iter_dasha_periods walks them; end_day pins the last end
+    to the parent's end at fractional levels.
+    """
+    bounds = [start_day]
+    for d in days:
+        bounds.append(bounds[-1] + d)
+    if end_day is not None:
+        bounds[-1] = end_day
+    return bounds
+
+
+def dasha_at(moon_sidereal, birth_dt, when, depth=MAX_DASHA_DEPTH):
+    """
+    Periods running at `when`, outermost first, without building the tree:
+    [{"mahadasha": .., "start": .., "end": ..}, {"mahadasha": .., "antardasha": .., ...}, ...]
+
+    Matches the periods of build_dasha_tree exactly, including the
+    years/months/days keys of the Mahadasha entry. The list is shorter
+    than `depth` when `when` falls in the few days a parent period has left
+    after its (day-truncated) sub-periods, and empty outside the 9 Mahadashas.
+    """
+    if depth < 1:
+        raise ValueError(f"Dasha depth must be at least 1, got {depth}.")
+    depth = min(depth, len(DASHA_LEVELS))
+
+    start_index = _starting_lord_index(moon_sidereal)
+    offset = (when - birth_dt) / timedelta(days=1)
+
+    bounds = _boundaries(0, _mahadasha_days(start_index))
+    lords = [DASHA_ORDER[(start_index + i) % 9] for i in range(9)]
+    result = []
+
+    for level in range(depth):
+        if offset < bounds[0] or offset >= bounds[-1]:
+            break
+
+        i = bisect_right(bounds, offset) - 1
+        period = {k: result[-1][k] for k in DASHA_LEVELS[:level]} if result else {}
+        period[DASHA_LEVELS[level]] = lords[i]
+
+        start_day, end_day = bounds[i], bounds[i + 1]
+        period["start"] = birth_dt + timedelta(days=start_day)
+        period["end"] = birth_dt + timedelta(days=end_day)
+        if level == 0:
+            period.update(_mahadasha_terms(start_index)[i])
+        result.append(period)
+
+        sub_days = _sub_period_days(end_day - start_day, level + 1)
+        bounds = _boundaries(start_day, sub_days, end_day if level + 1 >= FRACTIONAL_LEVEL else None)
+        lords = DASHA_ORDER
+
+    return result
+
+
+def dasha_at_many(moon_sidereal, birth_dts, whens, depth=MAX_DASHA_DEPTH):
+    """
+    Vectorised dasha_at over arrays of charts and query dates.
+
+    moon_sidereal: array of sidereal Moon longitudes
+    birth_dts, whens: arrays of datetimes (anything np.datetime64 accepts)
+
+    Returns {"lords": int array (N, depth) of DASHA_ORDER indices, -1 where no
+    period runs; "start"/"end": datetime64 arrays (N, depth), NaT where -1}.
+    """
+    if depth < 1:
+        raise ValueError(f"Dasha depth must be at least 1, got {depth}.")
+    depth = min(depth, len(DASHA_LEVELS))
+
+    moon = np.asarray(moon_sidereal, dtype=float)
+    birth = np.asarray(birth_dts, dtype="datetime64[us]")
+    when = np.asarray(whens, dtype="datetime64[us]")
+    n = moon.shape[0]
+
+    lords = np.full((n, depth), -1, dtype=np.int64)
+    start_days = np.zeros((n, depth))
+    end_days = np.zeros((n, depth))
+
+    start_index = (np.floor(moon / (360 / 27)).astype(np.int64)) % 9
+    offset = (when - birth) / np.timedelta64(1, "D")
+
+    md_days = np.array([_mahadasha_days(i) for i in range(9)])  # (start lord, position)
+    durations = md_days[start_index]                                # (N, 9)
+    order = (start_index[:, None] + np.arange(9)) % 9               # lord index per position
+    bounds = np.concatenate([np.zeros((n, 1)), np.cumsum(durations, axis=1)], axis=1)
+    alive = np.ones(n, dtype=bool)
+
+    for level in range(depth):
+        alive &= (offset >= bounds[:, 0]) & (offset < bounds[:, -1])
+
+        i = np.clip((offset[:, None] >= bounds[:, 1:]).sum(axis=1), 0, 8)
+        rows = np.arange(n)
+        start_day = bounds[rows, i]
+        end_day = bounds[rows, i + 1]
+
+        lords[:, level] = np.where(alive, order[rows, i], -1)
+        start_days[:, level] = start_day
+        end_days[:, level] = end_day
+
+        # Same accumulation as iter_dasha_periods, so boundaries agree exactly.
+        durations = (end_day - start_day)[:, None] * _SUB_FRACTIONS[None, :]
+        if level + 1 < FRACTIONAL_LEVEL:
+            durations = np.floor(durations)
+        bounds = np.cumsum(np.concatenate([start_day[:, None], durations], axis=1), axis=1)
+        if level + 1 >= FRACTIONAL_LEVEL:
+            bounds[:, -1] = end_day
+        order = np.broadcast_to(np.arange(9), (n, 9))
+
+    day_us = 86400 * 10**6
+    start = birth[:, None] + np.round(start_days * day_us).astype(np.int64).astype("timedelta64[us]")
+    end = birth[:, None] + np.round(end_days * day_us).astype(np.int64).astype("timedelta64[us]")
+    missing = lords < 0
+    start[missing] = np.datetime64("NaT")
+    end[missing] = np.datetime64("NaT")
+
+    return {"lords": lords, "start": start, "end": end}
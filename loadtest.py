@@ -0,0 +1,245 @@
+# loadtest.py
+# Async load generator for the HTTP API: starts server:app locally or
+# targets any URL, and reports throughput, latency percentiles and errors.
+#
+#   python loadtest.py [--url URL] [--concurrency 16] [--duration 30]
+#                      [--mix astrology=8,stream=1,batch=1] [--workers 1]
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+
+try:  # optional: pip install httpx
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+from corpus import DEFAULT_SEED, make_corpus
+
+DEFAULT_MIX = "astrology=8,sections=2,stream=1,batch=1"
+BATCH_SIZE = 10
+
+
+# ----------------------------------------------------
+# Request mix
+# ----------------------------------------------------
+def _body(item):
+    return {
+        "dob": item["dob"], "tob": item["tob"], "tz": item["tz_str"],
+        "latitude": item["latitude"], "longitude": item["longitude"],
+    }
+
+
+def _astrology(item, corpus, rng):
+    return "POST", "/astrology", _body(item)
+
+
+def _sections(item, corpus, rng):
+    return "POST", "/astrology", {**_body(item), "include": ["panchanga", "dasha"]}
+
+
+def _stream(item, corpus, rng):
+    return "POST", "/astrology/stream", _body(item)
+
+
+def _batch(item, corpus, rng):
+    return "POST", "/astrology/batch", {"items": [_body(x) for x in rng.sample(corpus, BATCH_SIZE)]}
+
+
+def _dasha_stream(item, corpus, rng):
+    return "POST", "/astrology/dasha/stream", {**_body(item), "depth": 3}
+
+
+REQUESTS = {
+    "astrology": _astrology,
+    "sections": _sections,
+    "stream": _stream,
+    "batch": _batch,
+    "dasha_stream": _dasha_stream,
+}
+
+
+def parse_mix(spec):
+    """'astrology=8,batch=1' -> {"astrology": 8.0, "batch": 1.0}"""
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in REQUESTS:
+            raise ValueError(f"Unknown request kind '{name}', expected one of {sorted(REQUESTS)}.")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+# ----------------------------------------------------
+# Local server
+# ----------------------------------------------------
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_local_server(workers=1, timeout=60.0):
+    """Run `uvicorn server:app` on a free port; returns (process, base_url) once / answers."""
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        env={**os.environ},
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Local server exited with code {process.returncode}.")
+        try:
+            if httpx.get(url + "/", timeout=1.0).status_code == 200:
+                return process, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    process.terminate()
+    raise RuntimeError(f"Local server did not answer on {url} within {timeout:.0f}s.")
+
+
+# ----------------------------------------------------
+# Load generation
+# ----------------------------------------------------
+async def _worker(client, mix, corpus, rng, deadline, remaining, samples):
+    kinds, weights = list(mix), list(mix.values())
+    while time.monotonic() < deadline:
+        if remaining is not None:
+            if remaining[0] <= 0:
+                return
+            remaining[0] -= 1
+        kind = rng.choices(kinds, weights)[0]
+        method, path, body = REQUESTS[kind](rng.choice(corpus), corpus, rng)
+
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, path, json=body)
+            await response.aread()
+            outcome = response.status_code
+        except httpx.HTTPError as exc:
+            outcome = type(exc).__name__
+        samples.append((kind, time.perf_counter() - start, outcome))
+
+
+async def run_load(url, mix, concurrency=16, duration=30.0, total=None, seed=DEFAULT_SEED,
+                   corpus_size=200, timeout=60.0):
+    """
+    Closed-loop load: `concurrency` clients each send the next request as
+    soon as the previous one completes, until `duration` seconds pass or
+    `total` requests have been sent. Returns (samples, elapsed seconds).
+    """
+    corpus = make_corpus(corpus_size, seed)
+    samples = []
+    remaining = [total] if total else None
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+        start = time.monotonic()
+        deadline = start + duration
+        await asyncio.gather(*(
+            _worker(client, mix, corpus, random.Random(seed + i), deadline, remaining, samples)
+            for i in range(concurrency)
+        ))
+        elapsed = time.monotonic() - start
+    return samples, elapsed
+
+
+# ----------------------------------------------------
+# Report
+# ----------------------------------------------------
+def _percentile(ordered, q):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def summarize(samples, elapsed):
+    """Per request kind plus "total": count, rps, error rate, status counts, p50/p95/p99 (ms)."""
+    groups = defaultdict(list)
+    for kind, seconds, outcome in samples:
+        groups[kind].append((seconds, outcome))
+        groups["total"].append((seconds, outcome))
+
+    report = {}
+    for kind, rows in groups.items():
+        latencies = sorted(seconds for seconds, _ in rows)
+        outcomes = Counter(str(outcome) for _, outcome in rows)
+        errors = sum(n for outcome, n in outcomes.items() if not outcome.startswith("2"))
+        report[kind] = {
+            "requests": len(rows),
+            "rps": len(rows) / elapsed if elapsed else 0.0,
+            "error_rate": errors / len(rows),
+            "outcomes": dict(outcomes),
+            "p50_ms": _percentile(latencies, 0.50) * 1000,
+            "p95_ms": _percentile(latencies, 0.95) * 1000,
+            "p99_ms": _percentile(latencies, 0.99) * 1000,
+        }
+    return report
+
+
+def print_report(report, elapsed, concurrency):
+    print(f"{elapsed:.1f}s at concurrency {concurrency}")
+    print(f"{'kind':<14} {'requests':>9} {'rps':>8} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  outcomes")
+    for kind in sorted(report, key=lambda k: (k == "total", k)):
+        row = report[kind]
+        outcomes = " ".join(f"{k}:{v}" for k, v in sorted(row["outcomes"].items()))
+        print(f"{kind:<14} {row['requests']:>9} {row['rps']:>8.1f} {row['error_rate']:>6.1%} "
+              f"{row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f}  {outcomes}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive the Astrology API with concurrent requests.")
+    parser.add_argument("--url", help="target base URL (default: start server:app locally)")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the local server")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--requests", type=int, help="stop after this many requests")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"kind=weight,... from {sorted(REQUESTS)}")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-request seconds")
+    parser.add_argument("--json", dest="json_out", help="also write the report to this file")
+    args = parser.parse_args()
+
+    if httpx is None:
+        sys.exit("loadtest.py needs httpx: pip install httpx")
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    process = None
+    url = args.url
+    if url is None:
+        process, url = start_local_server(args.workers)
+    try:
+        print(f"Load testing {url} with mix {mix}")
+        samples, elapsed = asyncio.run(run_load(
+            url, mix, args.concurrency, args.duration, args.requests, args.seed, timeout=args.timeout
+        ))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+
+    report = summarize(samples, elapsed)
+    print_report(report, elapsed, args.concurrency)
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump({"url": url, "mix": mix, "concurrency": args.concurrency,
+                       "elapsed": elapsed, "report": report}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
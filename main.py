@@ -1,22 +1,30 @@
 from astrology_full import astrology_full
+from exporters import write_msgpack
 import json
+import sys
 from pathlib import Path
 
 
 def save_output(payload, filename="astrology_output.json"):
+    """Write JSON, or MessagePack (typed datetimes, much smaller) for a .msgpack filename."""
     path = Path(filename)
+    if path.suffix == ".msgpack":
+        return write_msgpack(payload, path)
     path.write_text(json.dumps(payload, indent=2, default=str), encoding="utf-8")
     return str(path.resolve())
 
 
 if __name__ == "__main__":
+    filename = sys.argv[1] if len(sys.argv) > 1 else "astrology_output.json"
     result = astrology_full(
         dob="1977-08-04",
         tob="01:30",
         tz_str="Asia/Kolkata",
         latitude=16.1817369,
-        longitude=81.1348181
+        longitude=81.1348181,
+        # MessagePack keeps datetimes typed; JSON needs them as strings
+        json_safe=not filename.endswith(".msgpack")
     )
 
-    filepath = save_output(result)
+    filepath = save_output(result, filename)
     print(f"Astrology data saved to {filepath}")
\ No newline at end of file
@@ -0,0 +1,109 @@
+# metrics.py
+# Per-stage timers, histograms and Prometheus text exposition (no client library needed).
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+
+# Seconds; stages range from ~0.1 ms (cache hits) to seconds (cold ephemeris)
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Timings(dict):
+    """
+    {step: seconds} for one request. Steps may nest; each records only its
+    own time, so a stage that builds the ChartContext is not also charged
+    for the "context" step inside it and the values add up to the total.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._nested = []
+
+    @contextmanager
+    def step(self, name):
+        self._nested.append(0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = self._nested.pop()
+            if self._nested:
+                self._nested[-1] += elapsed
+            self[name] = self.get(name, 0.0) + elapsed - nested
+
+
+def step(timings, name):
+    """timings.step(name), or a no-op when the caller is not collecting timings."""
+    return nullcontext() if timings is None else timings.step(name)
+
+
+class Histogram:
+    """Prometheus-style cumulative histogram with one label."""
+
+    def __init__(self, name, documentation, label, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label = label
+        self.buckets = tuple(buckets)
+        self._series = {}  # label value -> [bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, label_value, seconds):
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += seconds
+            series[2] += 1
+
+    def observe_all(self, timings):
+        for label_value, seconds in timings.items():
+            self.observe(label_value, seconds)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((k, list(v[0]), v[1], v[2]) for k, v in self._series.items())
+        for label_value, counts, total, count in series:
+            labels = f'{self.label}="{label_value}"'
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f"{self.name}_sum{{{labels}}} {total}")
+            lines.append(f"{self.name}_count{{{labels}}} {count}")
+        return "\n".join(lines)
+
+
+def render_stats(prefix, stats):
+    """Numeric fields of a stats() dict as Prometheus gauges."""
+    lines = []
+    for key, value in stats.items():
+        if isinstance(value, bool):
+            value = int(value)
+        if isinstance(value, (int, float)):
+            lines.append(f"# TYPE {prefix}_{key} gauge")
+            lines.append(f"{prefix}_{key} {value}")
+    return "\n".join(lines)
+
+
+def server_timing(timings):
+    """Server-Timing header value, durations in milliseconds."""
+    return ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in timings.items())
+
+
+# Process-wide histograms exported on /metrics
+stage_seconds = Histogram(
+    "astrology_stage_seconds", "Time spent in each astrology_full stage.", "stage"
+)
+request_seconds = Histogram(
+    "astrology_request_seconds", "Time to produce a response, by route.", "route"
+)
@@ -0,0 +1,177 @@
+# natal_cache.py
+# Two-tier cache of natal chart sections keyed by normalized birth input.
+
+import json
+import logging
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from config import NATAL_CACHE_DB, NATAL_CACHE_ROUND, NATAL_CACHE_SIZE, NATAL_CACHE_TTL
+
+logger = logging.getLogger("astrology_api.natal_cache")
+
+
+def _json_default(value):
+    # Raw (json_safe=False) payloads still carry datetimes and NumPy scalars
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+class NatalCache:
+    """
+    In-process LRU (bounded by `max_entries`, entries expire after
+    `ttl_seconds`) in front of an optional SQLite file that several uvicorn
+    workers can share. The LRU holds values pickled and every hit decodes
+    a fresh copy, so callers may mutate what they get back. The disk tier
+    stores values as JSON text; pass disk=False for values that would not
+    survive that round trip (datetimes, int dict keys).
+
+    Keys normalize dob/tob through datetime parsing and round lat/lon to
+    `round_digits` decimals (4 digits is about 11 m), so inputs that differ
+    only below that precision share one entry. Expired disk rows are
+    deleted every `PRUNE_EVERY` writes.
+    """
+
+    PRUNE_EVERY = 256
+
+    def __init__(self, max_entries=1024, ttl_seconds=86400, db_path="", round_digits=4):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self.round_digits = round_digits
+
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._disk_writes = 0
+
+    def key(self, dob, tob, tz_str, latitude, longitude, *extra):
+        dt = datetime.strptime(dob + " " + tob, "%Y-%m-%d %H:%M")
+        n = self.round_digits
+        parts = [dt.strftime("%Y-%m-%dT%H:%M"), tz_str, f"{latitude:.{n}f}", f"{longitude:.{n}f}"]
+        parts.extend(str(x) for x in extra)
+        return "|".join(parts)
+
+    # ---------------------------------------------------
+    # Disk tier
+    # ---------------------------------------------------
+    def _db(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS natal (key TEXT PRIMARY KEY, created REAL, payload TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS natal_created ON natal (created)")
+            self._local.conn = conn
+        return conn
+
+    def _disk_get(self, key):
+        try:
+            row = self._db().execute(
+                "SELECT payload FROM natal WHERE key = ? AND created > ?",
+                (key, time.time() - self.ttl_seconds),
+            ).fetchone()
+        except sqlite3.Error:
+            logger.exception("Natal cache read failed")
+            return None
+        return json.loads(row[0]) if row else None
+
+    def _disk_put(self, key, value):
+        with self._lock:
+            self._disk_writes += 1
+            prune = self._disk_writes % self.PRUNE_EVERY == 1
+        now = time.time()
+        try:
+            with self._db() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO natal (key, created, payload) VALUES (?, ?, ?)",
+                    (key, now, json.dumps(value, default=_json_default)),
+                )
+                if prune:
+                    conn.execute("DELETE FROM natal WHERE created < ?", (now - self.ttl_seconds,))
+        except sqlite3.Error:
+            logger.exception("Natal cache write failed")
+
+    # ---------------------------------------------------
+    # Public API
+    # ---------------------------------------------------
+    def _remember(self, key, value):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl_seconds, blob)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, key, disk=True):
+        blob = None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.time():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    blob = entry[1]
+                else:
+                    del self._entries[key]
+        if blob is not None:
+            return pickle.loads(blob)
+
+        value = self._disk_get(key) if disk and self.db_path else None
+        if value is not None:
+            self._remember(key, value)
+            with self._lock:
+                self.disk_hits += 1
+            return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, value, disk=True):
+        self._remember(key, value)
+        if disk and self.db_path:
+            self._disk_put(key, value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.db_path:
+            with self._db() as conn:
+                conn.execute("DELETE FROM natal")
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "disk": bool(self.db_path),
+            }
+
+
+# Process-wide cache used by astrology_full
+natal_cache = NatalCache(
+    max_entries=NATAL_CACHE_SIZE,
+    ttl_seconds=NATAL_CACHE_TTL,
+    db_path=NATAL_CACHE_DB,
+    round_digits=NATAL_CACHE_ROUND,
+)
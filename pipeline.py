@@ -0,0 +1,358 @@
+# pipeline.py
+# Out-of-core chart pipeline for corpus-scale inputs: parse -> ephemeris ->
+# derived sections -> write, one thread per stage, connected by bounded
+# queues of fixed-size chunks. A slow stage blocks the ones before it
+# instead of letting work pile up, so peak memory is set by the queue and
+# chunk sizes, not by the input size. Output, errors and checkpoint/resume
+# are the same as bulk.py's.
+#
+#   python pipeline.py INPUT.csv|INPUT.jsonl OUT_DIR [--format jsonl|parquet|arrow]
+#                      [--workers N] [--chunk-size 50] [--queue-size 4]
+#                      [--shard-size 10000] [--exclude transits] [--json REPORT]
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+try:  # Unix only
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None
+
+from bulk import (
+    CHECKPOINT, DEFAULT_CHUNK_SIZE, DEFAULT_SHARD_SIZE, FORMATS, Progress, ShardedOutput,
+    chunked, count_records, format_duration, open_output, read_records, warm_worker,
+)
+from config import BATCH_WORKERS
+
+DEFAULT_QUEUE_SIZE = 4  # chunks waiting between two stages
+ROWS_PER_BATCH = 200  # charts per Parquet/Arrow record batch (~800 dasha rows each)
+PIPELINE_STAGES = ("parse", "ephemeris", "derived", "write")
+
+# Sections whose stages need the ephemeris (ChartContext); the rest are derived from them
+EPHEMERIS_SECTIONS = ("ayanamsa", "moon", "lagna", "planets")
+
+_DONE = object()
+
+
+def peak_rss_mb():
+    """This process's peak resident set size so far, in MB (None where unsupported)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+# ----------------------------------------------------
+# Worker steps (one chunk per call, in a pool process)
+# ----------------------------------------------------
+def _ephemeris_chunk(records):
+    """(record_id, kwargs, {section: value} | None, error) per record, plus busy seconds and peak RSS."""
+    from stages import ChartInput, run_stages
+
+    start = time.perf_counter()
+    results = []
+    for record_id, kwargs, error in records:
+        known = None
+        if error is None:
+            try:
+                known = run_stages(ChartInput(**kwargs), EPHEMERIS_SECTIONS)
+            except Exception as exc:
+                error = f"Failed to compute astrology data: {exc}"
+        results.append((record_id, kwargs, known, error))
+    return results, time.perf_counter() - start, peak_rss_mb()
+
+
+def _derived_chunk(records, fmt, sections):
+    """
+    The remaining sections from each record's ephemeris results, then the
+    output form bulk._compute_chunk produces: (record_id, data, error).
+    """
+    from exporters import flatten_chart
+    from serialization import dumps
+    from stages import ChartInput, run_stages
+
+    start = time.perf_counter()
+    results = []
+    for record_id, kwargs, known, error in records:
+        if error is not None:
+            results.append((record_id, None, error))
+            continue
+        try:
+            values = {**known, **run_stages(ChartInput(**kwargs), sections, known)}
+        except Exception as exc:
+            results.append((record_id, None, f"Failed to compute astrology data: {exc}"))
+            continue
+        payload = {name: values[name] for name in sections}
+        if fmt == "jsonl":
+            data = dumps({"id": record_id, "input": kwargs, "result": payload})
+        else:
+            data = flatten_chart(str(record_id), payload)
+        results.append((record_id, data, None))
+    return results, time.perf_counter() - start, peak_rss_mb()
+
+
+# ----------------------------------------------------
+# Stage plumbing
+# ----------------------------------------------------
+class StageStats:
+    """
+    Per-stage counters. `busy` is time spent doing the stage's own work
+    (summed over worker processes for the pool stages); `starved` is time
+    waiting for input and `blocked` time waiting for room downstream.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.rows = 0
+        self.busy = 0.0
+        self.starved = 0.0
+        self.blocked = 0.0
+        self.peak_worker_mb = None
+
+    def as_dict(self, elapsed):
+        return {
+            "rows": self.rows,
+            "busy_seconds": self.busy,
+            "starved_seconds": self.starved,
+            "blocked_seconds": self.blocked,
+            "rows_per_second": self.rows / elapsed if elapsed else 0.0,
+            "rows_per_busy_second": self.rows / self.busy if self.busy else 0.0,
+            "peak_worker_mb": self.peak_worker_mb,
+        }
+
+
+class _Stopped(Exception):
+    pass
+
+
+class _Channel:
+    """A bounded queue between two stages that gives up once the pipeline is stopping."""
+
+    def __init__(self, size, stop):
+        self._queue = queue.Queue(maxsize=size)
+        self._stop = stop
+
+    def put(self, item, stats):
+        start = time.perf_counter()
+        try:
+            while True:
+                if self._stop.is_set():
+                    raise _Stopped
+                try:
+                    self._queue.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    pass
+        finally:
+            stats.blocked += time.perf_counter() - start
+
+    def get(self, stats):
+        start = time.perf_counter()
+        try:
+            while True:
+                if self._stop.is_set():
+                    raise _Stopped
+                try:
+                    return self._queue.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+        finally:
+            stats.starved += time.perf_counter() - start
+
+
+def _parse_stage(records, chunk_size, outbox, stats):
+    chunks = chunked(records, chunk_size)
+    while True:
+        start = time.perf_counter()
+        chunk = next(chunks, None)
+        stats.busy += time.perf_counter() - start
+        if chunk is None:
+            break
+        stats.rows += len(chunk)
+        outbox.put(chunk, stats)
+    outbox.put(_DONE, stats)
+
+
+def _pool_stage(pool, fn, args, in_flight, inbox, outbox, stats):
+    """Send chunks through `fn` on the pool, at most `in_flight` at once, passing results on in order."""
+    pending = deque()
+
+    def emit(future):
+        results, busy, peak = future.result()
+        stats.rows += len(results)
+        stats.busy += busy
+        if peak is not None:
+            stats.peak_worker_mb = max(stats.peak_worker_mb or 0.0, peak)
+        outbox.put(results, stats)
+
+    while True:
+        chunk = inbox.get(stats)
+        if chunk is _DONE:
+            break
+        pending.append(pool.submit(fn, chunk, *args))
+        if len(pending) >= in_flight:
+            emit(pending.popleft())
+    while pending:
+        emit(pending.popleft())
+    outbox.put(_DONE, stats)
+
+
+def _start(name, target, args, stop, failures):
+    def run():
+        try:
+            target(*args)
+        except _Stopped:
+            pass
+        except BaseException as exc:
+            failures.append(exc)
+            stop.set()
+
+    thread = threading.Thread(target=run, name=f"pipeline-{name}", daemon=True)
+    thread.start()
+    return thread
+
+
+# ----------------------------------------------------
+# Run
+# ----------------------------------------------------
+def run_pipeline(input_path, out_dir, fmt="jsonl", workers=BATCH_WORKERS, chunk_size=DEFAULT_CHUNK_SIZE,
+                 queue_size=DEFAULT_QUEUE_SIZE, shard_size=DEFAULT_SHARD_SIZE, exclude=None, progress=True):
+    """
+    Run parse -> ephemeris -> derived -> write over `input_path`. The two
+    compute stages share one pool of `workers` processes and keep at most
+    `workers` chunks each in flight. Returns {"state": checkpoint,
+    "elapsed": seconds, "stages": {stage: StageStats.as_dict()},
+    "peak_rss_mb": {"parent", "worker"}}.
+    """
+    from stages import select_sections
+
+    exclude = sorted(exclude or [])
+    state = open_output(input_path, out_dir, fmt, shard_size, exclude)
+    stats = {name: StageStats(name) for name in PIPELINE_STAGES}
+    started = time.monotonic()
+    if state["complete"]:
+        return _report(state, stats, 0.0)
+
+    sections = select_sections(exclude=exclude)
+    meter = Progress(state["records_done"], count_records(input_path), progress)
+    records = itertools.islice(read_records(input_path), state["records_done"], None)
+    output = ShardedOutput(out_dir, state, shard_size, ROWS_PER_BATCH)
+
+    stop = threading.Event()
+    failures = []
+    parsed, located, finished = (_Channel(queue_size, stop) for _ in range(3))
+    context = multiprocessing.get_context("spawn")
+    pool = ProcessPoolExecutor(workers, mp_context=context, initializer=warm_worker)
+    threads = [
+        _start("parse", _parse_stage, (records, chunk_size, parsed, stats["parse"]), stop, failures),
+        _start("ephemeris", _pool_stage,
+               (pool, _ephemeris_chunk, (), workers, parsed, located, stats["ephemeris"]), stop, failures),
+        _start("derived", _pool_stage,
+               (pool, _derived_chunk, (fmt, sections), workers, located, finished, stats["derived"]),
+               stop, failures),
+    ]
+
+    # The write stage runs here, so Ctrl-C lands where it can stop the others
+    write = stats["write"]
+    try:
+        while True:
+            results = finished.get(write)
+            if results is _DONE:
+                break
+            start = time.perf_counter()
+            for result in results:
+                output.write(*result)
+            write.rows += len(results)
+            write.busy += time.perf_counter() - start
+            meter.update({**state, "records_done": output.records_seen})
+    except _Stopped:
+        pass
+    except BaseException:
+        stop.set()
+        raise
+    finally:
+        if stop.is_set():
+            # Something failed: the checkpoint still points at the last committed shard
+            pool.shutdown(wait=False, cancel_futures=True)
+        for thread in threads:
+            thread.join()
+        pool.shutdown()
+    if failures:
+        raise failures[0]
+
+    state = output.close()
+    meter.update(state, force=True)
+    if progress and meter.end == "\r":
+        print(file=sys.stderr)
+    return _report(state, stats, time.monotonic() - started)
+
+
+def _report(state, stats, elapsed):
+    worker_peaks = [s.peak_worker_mb for s in stats.values() if s.peak_worker_mb is not None]
+    return {
+        "state": state,
+        "elapsed": elapsed,
+        "stages": {name: s.as_dict(elapsed) for name, s in stats.items()},
+        "peak_rss_mb": {"parent": peak_rss_mb(), "worker": max(worker_peaks) if worker_peaks else None},
+    }
+
+
+def print_report(report):
+    print(f"{'stage':<10} {'rows':>9} {'rows/s':>9} {'busy s':>9} {'rows/busy s':>12} "
+          f"{'starved s':>10} {'blocked s':>10}")
+    for name, row in report["stages"].items():
+        print(f"{name:<10} {row['rows']:>9,} {row['rows_per_second']:>9.1f} {row['busy_seconds']:>9.2f} "
+              f"{row['rows_per_busy_second']:>12.1f} {row['starved_seconds']:>10.2f} {row['blocked_seconds']:>10.2f}")
+    peak = report["peak_rss_mb"]
+    if peak["parent"] is not None:
+        worker = f", largest worker {peak['worker']:.0f} MB" if peak["worker"] is not None else ""
+        print(f"peak RSS: parent {peak['parent']:.0f} MB{worker}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute charts for a large input with bounded memory.")
+    parser.add_argument("input", help="CSV or JSONL birth records")
+    parser.add_argument("out_dir", help="shards, errors and checkpoint.json go here")
+    parser.add_argument("--format", choices=FORMATS, default="jsonl")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="records per chunk")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE,
+                        help="chunks buffered between two stages")
+    parser.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE,
+                        help="records per output shard (and per checkpoint)")
+    parser.add_argument("--exclude", default="", help="comma-separated sections to leave out")
+    parser.add_argument("--json", dest="json_out", help="also write the stage report to this file")
+    parser.add_argument("--quiet", action="store_true", help="no progress lines")
+    args = parser.parse_args()
+
+    exclude = [name.strip() for name in args.exclude.split(",") if name.strip()]
+    try:
+        report = run_pipeline(args.input, args.out_dir, args.format, args.workers, args.chunk_size,
+                              args.queue_size, args.shard_size, exclude, not args.quiet)
+    except ValueError as exc:
+        parser.error(str(exc))
+    except KeyboardInterrupt:
+        sys.exit(f"Interrupted; run the same command again to resume from {args.out_dir}/{CHECKPOINT}.")
+
+    state = report["state"]
+    print(f"{state['records_done']:,} records ({state['ok']:,} ok, {state['errors']:,} errors) "
+          f"in {state['shards_done']} shards under {Path(args.out_dir).resolve()} "
+          f"[{format_duration(report['elapsed'])}]")
+    print_report(report)
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# profiling.py
+# On-demand profiling of a single astrology_full call (admin-gated in server.py).
+
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+PROFILE_MODES = ("pstats", "collapsed")
+
+
+class StackSampler:
+    """
+    Samples one thread's Python stack every `interval` seconds from a
+    background thread and counts identical stacks, in the collapsed
+    "outer;inner;leaf count" format flame graph tools read. The GIL limits
+    the effective rate to about one sample per switch interval (5 ms).
+    """
+
+    def __init__(self, thread_id, interval=0.001):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{Path(code.co_filename).stem}:{code.co_name}")
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self):
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+
+def _save_path(directory, suffix):
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    return str(Path(directory) / f"astrology-{datetime.now():%Y%m%d-%H%M%S-%f}-{os.getpid()}{suffix}")
+
+
+def profile_call(fn, mode="pstats", save_dir="", limit=40, **kwargs):
+    """
+    Run fn(**kwargs) under cProfile ("pstats") or the stack sampler
+    ("collapsed"). Returns (result, profile) where profile is
+    {"format", "data" (text report), "path" (file written under save_dir, or None)}.
+    """
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown profile mode '{mode}', expected one of {PROFILE_MODES}.")
+
+    path = None
+    if mode == "pstats":
+        profiler = cProfile.Profile()
+        result = profiler.runcall(fn, **kwargs)
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(limit)
+        data = report.getvalue()
+        if save_dir:
+            path = _save_path(save_dir, ".prof")
+            profiler.dump_stats(path)
+    else:
+        with StackSampler(threading.get_ident()) as sampler:
+            result = fn(**kwargs)
+        data = sampler.collapsed()
+        if save_dir:
+            path = _save_path(save_dir, ".collapsed")
+            Path(path).write_text(data + "\n", encoding="utf-8")
+
+    return result, {"format": mode, "data": data, "path": path}
+
+
+def profile_astrology(mode="pstats", save_dir="", **kwargs):
+    """profile_call over astrology_full, bypassing the natal cache so the work is measured."""
+    from astrology_full import astrology_full
+
+    return profile_call(astrology_full, mode, save_dir, **kwargs, use_cache=False)
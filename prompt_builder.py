@@ -7,21 +7,38 @@ Usage:
         --chart-file astrology_output.json
 
 This prints a ready-to-use system prompt and user prompt. You can optionally
-write the prompt bundle to disk with --output prompt.json.
+write the prompt bundle to disk with --output prompt.json. With --budget N the
+chart is embedded as compact text of about N tokens (see chart_encoder.py)
+instead of the full JSON, and a per-section size report is printed.
+
+Batch mode builds one bundle per row of a JSONL file and streams them to
+JSONL, reading and rendering each distinct chart only once:
+
+    python prompt_builder.py --batch questions.jsonl --output prompts.jsonl \
+        [--chart-dir charts/] [--budget 600]
+
+    questions.jsonl rows: {"id": ..., "chart_file": "a.json" | "chart_id": "a",
+                           "question": "...", "extra_context": "..."}
 """
 
 from __future__ import annotations
 
 import argparse
 import json
+import sys
+import time
+from collections import OrderedDict
+from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterable, Iterator, NamedTuple, Optional, Union
 
+from chart_encoder import encode_chart, format_report
 from config import SIGNS
 from llm_prompts import (
     SYSTEM_PROMPT,
     TEMPLATE_CHART_SUMMARY,
     TEMPLATE_ANSWER,
+    TEMPLATE_ANSWER_COMPACT,
     format_top_planets,
 )
 
@@ -32,9 +49,17 @@ def load_chart(path: Path) -> Dict[str, Any]:
     return json.loads(path.read_text(encoding="utf-8"))
 
 
-def build_prompt_bundle(
-    chart: Dict[str, Any], question: str, extra_context: Optional[str] = None
-) -> Dict[str, str]:
+class PreparedChart(NamedTuple):
+    """The question-independent parts of a prompt, rendered once per chart."""
+
+    summary: str  # TEMPLATE_CHART_SUMMARY filled in
+    chart_data: str  # indented chart JSON, or the compact encoding with a budget
+    report: Optional[Dict[str, Dict[str, Any]]]  # encode_chart's size report (budget only)
+
+
+def prepare_chart(
+    chart: Dict[str, Any], budget: Optional[int] = None, when: Optional[datetime] = None
+) -> PreparedChart:
     meta = chart.get("meta", {})
     lagna = chart.get("lagna", {})
     moon = chart.get("moon", {})
@@ -64,23 +89,174 @@ def build_prompt_bundle(
         top_planets=top_planets or "N/A",
     )
 
+    if budget is None:
+        return PreparedChart(chart_summary, json.dumps(chart, indent=2, default=str), None)
+    chart_text, report = encode_chart(chart, budget, when)
+    return PreparedChart(chart_summary, chart_text, report)
+
+
+def render_bundle(
+    prepared: PreparedChart, question: str, extra_context: Optional[str] = None
+) -> Dict[str, Any]:
     extra_section = ""
     if extra_context:
         extra_section = f"\nAdditional life context to consider:\n{extra_context.strip()}\n"
 
-    user_prompt = (
-        chart_summary
-        + extra_section
-        + TEMPLATE_ANSWER.format(
-            question=question,
-            chart_json=json.dumps(chart, indent=2, default=str),
-        )
-    )
+    if prepared.report is None:
+        answer = TEMPLATE_ANSWER.format(question=question, chart_json=prepared.chart_data)
+    else:
+        answer = TEMPLATE_ANSWER_COMPACT.format(question=question, chart_text=prepared.chart_data)
 
-    return {
+    user_prompt = prepared.summary + extra_section + answer
+
+    bundle: Dict[str, Any] = {
         "system": SYSTEM_PROMPT.strip(),
         "user": user_prompt.strip(),
     }
+    if prepared.report is not None:
+        bundle["report"] = prepared.report
+    return bundle
+
+
+def build_prompt_bundle(
+    chart: Dict[str, Any],
+    question: str,
+    extra_context: Optional[str] = None,
+    budget: Optional[int] = None,
+    when: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """
+    System and user prompts for one question. With `budget` (tokens) the
+    chart is embedded through chart_encoder.encode_chart, and the bundle
+    also carries its per-section "report"; `when` sets the dasha date.
+    """
+    return render_bundle(prepare_chart(chart, budget, when), question, extra_context)
+
+
+# ----------------------------------------------------
+# Batch mode: one JSONL row per question
+# ----------------------------------------------------
+class ChartLoadError(ValueError):
+    """A chart file that failed to load earlier; str() is the original error."""
+
+
+class ChartPromptCache:
+    """
+    LRU of PreparedChart by chart file, so each distinct chart is read,
+    parsed and rendered once however many questions refer to it. Rows
+    name their chart by "chart_file" (a path) or "chart_id" (looked up
+    as <chart_dir>/<chart_id>.json). A chart that fails to load is
+    cached as its error, which later rows get as ChartLoadError.
+    """
+
+    def __init__(
+        self,
+        chart_dir: str = ".",
+        budget: Optional[int] = None,
+        when: Optional[datetime] = None,
+        maxsize: int = 1024,
+    ):
+        self.chart_dir = Path(chart_dir)
+        self.budget = budget
+        self.when = when
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Union[PreparedChart, str]]" = OrderedDict()
+
+    def path_for(self, row: Dict[str, Any]) -> Path:
+        if row.get("chart_file"):
+            return Path(row["chart_file"])
+        if row.get("chart_id") is not None:
+            return self.chart_dir / f"{row['chart_id']}.json"
+        raise ValueError("Row needs a 'chart_file' or a 'chart_id'.")
+
+    def get(self, row: Dict[str, Any]) -> PreparedChart:
+        key = str(self.path_for(row))
+        prepared = self._entries.get(key)
+        if prepared is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+        else:
+            self.misses += 1
+            try:
+                prepared = prepare_chart(load_chart(Path(key)), self.budget, self.when)
+            except Exception as exc:
+                prepared = f"{type(exc).__name__}: {exc}"
+            self._entries[key] = prepared
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        if isinstance(prepared, str):
+            raise ChartLoadError(prepared)
+        return prepared
+
+
+def iter_batch_bundles(lines: Iterable[str], cache: ChartPromptCache) -> Iterator[Dict[str, Any]]:
+    """
+    One output record per non-blank input line: the row's "id" (when
+    given), "line", and the prompt bundle -- or an "error" for rows that
+    cannot be built, so one bad row does not stop the batch.
+    """
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        record: Dict[str, Any] = {"line": number}
+        try:
+            row = json.loads(line)
+            if not isinstance(row, dict):
+                raise ValueError(f"Row is a JSON {type(row).__name__}, expected an object.")
+            if "id" in row:
+                record["id"] = row["id"]
+            if not row.get("question"):
+                raise ValueError("Row has no 'question'.")
+            record.update(render_bundle(cache.get(row), row["question"], row.get("extra_context")))
+        except ChartLoadError as exc:
+            record["error"] = str(exc)
+        except Exception as exc:  # a malformed row or chart must not stop the batch
+            record["error"] = f"{type(exc).__name__}: {exc}"
+        yield record
+
+
+def run_batch(
+    input_path: str,
+    output_path: str = "-",
+    chart_dir: str = ".",
+    budget: Optional[int] = None,
+    when: Optional[datetime] = None,
+    cache_size: int = 1024,
+) -> Dict[str, Any]:
+    """
+    Stream prompt bundles for every row of `input_path` (JSONL) to
+    `output_path` (JSONL, "-" for stdout). With a budget and no `when`,
+    the dasha date is fixed at the start so every row uses the same one.
+    Returns counts and timing.
+    """
+    if budget is not None and when is None:
+        when = datetime.now()
+    cache = ChartPromptCache(chart_dir, budget, when, cache_size)
+    rows = errors = 0
+    start = time.perf_counter()
+
+    out = sys.stdout if output_path == "-" else open(output_path, "w", encoding="utf-8")
+    try:
+        with open(input_path, encoding="utf-8") as lines:
+            for record in iter_batch_bundles(lines, cache):
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                rows += 1
+                errors += "error" in record
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    elapsed = time.perf_counter() - start
+    return {
+        "rows": rows,
+        "errors": errors,
+        "charts_loaded": cache.misses,
+        "chart_cache_hits": cache.hits,
+        "seconds": elapsed,
+        "rows_per_second": rows / elapsed if elapsed else 0.0,
+    }
 
 
 def main():
@@ -94,7 +270,6 @@ def main():
     )
     parser.add_argument(
         "--question",
-        required=True,
         help="Natural-language question to ask the astrologer LLM.",
     )
     parser.add_argument(
@@ -104,12 +279,51 @@ def main():
     )
     parser.add_argument(
         "--output",
-        help="Optional path to write the prompt bundle as JSON.",
+        help="Optional path to write the prompt bundle as JSON (JSONL with --batch; default stdout).",
+    )
+    parser.add_argument(
+        "--budget",
+        type=int,
+        help="Embed the chart as compact text of about this many tokens instead of full JSON.",
+    )
+    parser.add_argument(
+        "--as-of",
+        type=datetime.fromisoformat,
+        help="Date (YYYY-MM-DD) for the current/next dasha periods with --budget (default: now).",
+    )
+
+    parser.add_argument(
+        "--batch",
+        help="JSONL file of questions to build prompts for, instead of --question.",
+    )
+    parser.add_argument(
+        "--chart-dir",
+        default=".",
+        help="With --batch: directory holding <chart_id>.json for rows that give a chart_id.",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=1024,
+        help="With --batch: distinct charts kept rendered in memory.",
     )
 
     args = parser.parse_args()
+    if args.batch:
+        stats = run_batch(
+            args.batch, args.output or "-", args.chart_dir, args.budget, args.as_of, args.cache_size
+        )
+        print(
+            f"{stats['rows']} prompts ({stats['errors']} errors) from {stats['charts_loaded']} chart loads "
+            f"in {stats['seconds']:.2f}s ({stats['rows_per_second']:.0f} rows/s)",
+            file=sys.stderr,
+        )
+        return
+    if not args.question:
+        parser.error("--question is required unless --batch is given")
+
     chart = load_chart(Path(args.chart_file))
-    bundle = build_prompt_bundle(chart, args.question, args.extra_info)
+    bundle = build_prompt_bundle(chart, args.question, args.extra_info, args.budget, args.as_of)
 
     if args.output:
         Path(args.output).write_text(json.dumps(bundle, indent=2), encoding="utf-8")
@@ -119,6 +333,9 @@ def main():
     print(bundle["system"])
     print("\n=== User Prompt ===\n")
     print(bundle["user"])
+    if args.budget is not None:
+        print("\n=== Chart Size (estimated tokens) ===\n")
+        print(format_report(bundle["report"], args.budget))
 
 
 if __name__ == "__main__":
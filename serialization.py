@@ -0,0 +1,49 @@
+# serialization.py
+# Single-pass JSON encoding of chart payloads (orjson when installed).
+
+from datetime import datetime
+
+from fastapi.responses import JSONResponse
+
+try:  # optional: pip install orjson
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+
+def _default(value):
+    # Anything orjson (or json) does not encode natively
+    if np is not None and isinstance(value, (np.generic, np.ndarray)):
+        return value.tolist()
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(obj):
+        """Encode a raw astrology_full result (datetimes, NumPy values) straight to bytes."""
+        return orjson.dumps(obj, default=_default, option=_OPTIONS)
+else:
+    import json
+
+    def dumps(obj):
+        """Encode a raw astrology_full result (datetimes, NumPy values) straight to bytes."""
+        return json.dumps(obj, default=_default, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    Response for raw chart payloads. Returned directly from an endpoint it
+    skips FastAPI's jsonable_encoder, so the payload is walked once.
+    """
+
+    def render(self, content):
+        return dumps(content)
@@ -1,11 +1,47 @@
+import hashlib
+import hmac
+import json
 import logging
+import time
+from contextlib import asynccontextmanager
+from datetime import date, datetime
+from typing import Annotated, List, Literal, Optional
 
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, Header, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel, Field
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
 
-from astrology_full import astrology_full, AstrologyComputationError
+from astrology_full import (
+    astrology_full,
+    astrology_section_stream,
+    dasha_period_stream,
+    AstrologyComputationError,
+)
+from batch import run_batch, shutdown_pool
+from compression import compress_response
+from compute_executor import ExecutorSaturated, compute_executor
+from coalesce import astrology_flights
+from config import (
+    BATCH_MAX_ITEMS,
+    CHART_MAX_AGE,
+    COALESCE_REQUESTS,
+    COMPUTE_RETRY_AFTER,
+    FAST_JSON,
+    PROFILE_DIR,
+    PROFILE_TOKEN,
+    SERVER_TIMING,
+    TRANSIT_REFRESH,
+)
+from dasha import DASHA_LEVELS, MAX_DASHA_DEPTH
+from metrics import Timings, render_stats, request_seconds, server_timing, stage_seconds
+from natal_cache import natal_cache
+from profiling import profile_astrology
+from serialization import FastJSONResponse, dumps
+from stages import NATAL_SECTIONS, SECTIONS
+from transit_cache import snapshots as transit_snapshots
 
 
 class AstroRequest(BaseModel):
@@ -14,13 +50,67 @@ class AstroRequest(BaseModel):
     tz: str = Field(..., description="IANA timezone string", example="Asia/Kolkata")
     latitude: float = Field(..., example=16.1817369)
     longitude: float = Field(..., example=81.1348181)
+    dasha_levels: int = Field(
+        MAX_DASHA_DEPTH, ge=1, le=MAX_DASHA_DEPTH,
+        description="Dasha tree depth: 1=Mahadasha, 2=+Antardasha, 3=+Pratyantardasha",
+    )
+    dasha_expand: Literal["all", "current"] = Field(
+        "all", description="'current' expands only the periods running now"
+    )
+    include: Optional[List[Literal[SECTIONS]]] = Field(
+        None, description="Sections to return (default: all; an empty list is rejected)",
+        example=["panchanga", "dasha"],
+    )
+    exclude: Optional[List[Literal[SECTIONS]]] = Field(
+        None, description="Sections to leave out", example=["transits"]
+    )
+
+
+class ChartQuery(BaseModel):
+    dob: str = Field(..., example="1977-08-04")
+    tob: str = Field(..., example="01:30")
+    tz: str = Field(..., description="IANA timezone string", example="Asia/Kolkata")
+    latitude: float = Field(..., example=16.1817369)
+    longitude: float = Field(..., example=81.1348181)
+    dasha_levels: int = Field(MAX_DASHA_DEPTH, ge=1, le=MAX_DASHA_DEPTH)
+    dasha_expand: Literal["all", "current"] = "all"
+    include: Optional[List[Literal[NATAL_SECTIONS]]] = None
+    exclude: Optional[List[Literal[NATAL_SECTIONS]]] = None
+
+
+class BatchRequest(BaseModel):
+    items: List[AstroRequest] = Field(..., min_length=1, max_length=BATCH_MAX_ITEMS)
+
+
+class DashaStreamRequest(BaseModel):
+    dob: str = Field(..., example="1977-08-04")
+    tob: str = Field(..., example="01:30")
+    tz: str = Field(..., description="IANA timezone string", example="Asia/Kolkata")
+    latitude: float = Field(..., example=16.1817369)
+    longitude: float = Field(..., example=81.1348181)
+    depth: int = Field(
+        len(DASHA_LEVELS), ge=1, le=len(DASHA_LEVELS),
+        description="1=Mahadasha .. 4=Sookshma, 5=Prana",
+    )
+    start: Optional[date] = Field(None, description="Only periods ending after this date", example="2026-01-01")
+    end: Optional[date] = Field(None, description="Only periods starting before this date", example="2028-01-01")
 
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("astrology_api")
 
 
-app = FastAPI(title="Astrology API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if TRANSIT_REFRESH:
+        transit_snapshots.start()
+    yield
+    transit_snapshots.stop()
+    compute_executor.shutdown()
+    shutdown_pool()
+
+
+app = FastAPI(title="Astrology API", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -31,27 +121,326 @@ app.add_middleware(
 )
 
 
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    # Route templates only, so unknown paths cannot grow the label set
+    request_seconds.observe(getattr(route, "path", "unmatched"), time.perf_counter() - start)
+    return response
+
+
 @app.get("/")
 def health_check():
     return {"status": "ok", "message": "Astrology API is running"}
 
 
+@app.get("/stats")
+def stats():
+    return {
+        "transit_cache": transit_snapshots.stats(),
+        "compute": compute_executor.stats(),
+        "natal_cache": natal_cache.stats(),
+        "coalescing": astrology_flights.stats(),
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus text exposition: stage and request histograms plus cache/executor gauges."""
+    return PlainTextResponse(
+        "\n".join([
+            stage_seconds.render(),
+            request_seconds.render(),
+            render_stats("astrology_transit_cache", transit_snapshots.stats()),
+            render_stats("astrology_natal_cache", natal_cache.stats()),
+            render_stats("astrology_compute", compute_executor.stats()),
+            render_stats("astrology_coalescing", astrology_flights.stats()),
+        ]) + "\n",
+        media_type="text/plain; version=0.0.4",
+    )
+
+
+def _astrology_kwargs(payload: AstroRequest):
+    return {
+        "dob": payload.dob,
+        "tob": payload.tob,
+        "tz_str": payload.tz,
+        "latitude": payload.latitude,
+        "longitude": payload.longitude,
+        "dasha_levels": payload.dasha_levels,
+        "dasha_expand": payload.dasha_expand,
+        "json_safe": not FAST_JSON,
+        "include": payload.include,
+        "exclude": payload.exclude,
+    }
+
+
+def _require_profile_token(token):
+    if not PROFILE_TOKEN:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    if token is None or not hmac.compare_digest(token, PROFILE_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid profile token")
+
+
 @app.post("/astrology")
-def compute_astrology(payload: AstroRequest):
+async def compute_astrology(
+    payload: AstroRequest,
+    request: Request,
+    profile: Optional[Literal["pstats", "collapsed"]] = Query(
+        None, description="Admin only: return {result, profile} with a cProfile or sampled-stack report"
+    ),
+    x_profile_token: Optional[str] = Header(None),
+):
+    if profile is not None:
+        _require_profile_token(x_profile_token)
+
+    timings = Timings()
     try:
-        return astrology_full(
+        if profile is None and COALESCE_REQUESTS:
+            # Identical payloads in flight share one computation; only the
+            # leader's timings are filled in
+            result = await astrology_flights.do(
+                payload.model_dump_json(),
+                compute_executor.run, astrology_full, **_astrology_kwargs(payload), timings=timings,
+            )
+        elif profile is None:
+            result = await compute_executor.run(
+                astrology_full, **_astrology_kwargs(payload), timings=timings
+            )
+        else:
+            result, report = await compute_executor.run(
+                profile_astrology, mode=profile, save_dir=PROFILE_DIR, **_astrology_kwargs(payload)
+            )
+            logger.info("Profiled /astrology for %s %s (%s)%s", payload.dob, payload.tob, profile,
+                        f", saved to {report['path']}" if report["path"] else "")
+            result = {"result": result, "profile": report}
+        with timings.step("serialize"):
+            response = FastJSONResponse(result) if FAST_JSON else JSONResponse(result)
+    except ExecutorSaturated as exc:
+        logger.warning("Rejecting request: %s", exc)
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy, retry later",
+            headers={"Retry-After": str(COMPUTE_RETRY_AFTER)},
+        ) from exc
+    except AstrologyComputationError as exc:
+        logger.error("Computation error: %s", exc, exc_info=True)
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    except Exception as exc:  # pragma: no cover - just defensive
+        logger.exception("Unexpected error while processing request")
+        raise HTTPException(status_code=500, detail="Internal server error") from exc
+
+    stage_seconds.observe_all(timings)
+    if SERVER_TIMING:
+        response.headers["Server-Timing"] = server_timing(timings)
+    return compress_response(response, request.headers.get("accept-encoding"))
+
+
+def _etag_matches(if_none_match, etag):
+    # Weak comparison, as If-None-Match requires
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+@app.get("/astrology/chart")
+async def get_chart(query: Annotated[ChartQuery, Query()], request: Request):
+    """
+    The natal sections (everything but transits) as a cacheable resource.
+    The ETag is a weak tag over the uncompressed body, so 200s in any
+    encoding and the 304 a matching If-None-Match gets all carry the same
+    one. With dasha_expand=all clients may reuse it for CHART_MAX_AGE
+    seconds before revalidating.
+    """
+    names = NATAL_SECTIONS if query.include is None else query.include
+    sections = [name for name in names if name not in (query.exclude or ())]
+    if not sections:
+        raise HTTPException(status_code=400, detail="No sections selected")
+    kwargs = {
+        "dob": query.dob,
+        "tob": query.tob,
+        "tz_str": query.tz,
+        "latitude": query.latitude,
+        "longitude": query.longitude,
+        "dasha_levels": query.dasha_levels,
+        "dasha_expand": query.dasha_expand,
+        "json_safe": not FAST_JSON,
+        "include": sections,
+    }
+    try:
+        result = await compute_executor.run(astrology_full, **kwargs)
+        response = FastJSONResponse(result) if FAST_JSON else JSONResponse(result)
+    except ExecutorSaturated as exc:
+        logger.warning("Rejecting request: %s", exc)
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy, retry later",
+            headers={"Retry-After": str(COMPUTE_RETRY_AFTER)},
+        ) from exc
+    except AstrologyComputationError as exc:
+        logger.error("Computation error: %s", exc, exc_info=True)
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    etag = 'W/"' + hashlib.sha256(response.body).hexdigest()[:32] + '"'
+    headers = {
+        "ETag": etag,
+        "Vary": "Accept-Encoding",
+        "Cache-Control": (
+            f"public, max-age={CHART_MAX_AGE}" if query.dasha_expand == "all" else "no-cache"
+        ),
+    }
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return compress_response(response, request.headers.get("accept-encoding"))
+
+
+@app.post("/astrology/batch")
+async def compute_astrology_batch(payload: BatchRequest):
+    """
+    Compute many charts across the process pool. Results come back in
+    request order; a failing item gets {"ok": false, "error": ...} instead
+    of failing the whole batch.
+    """
+    results = await run_batch([_astrology_kwargs(item) for item in payload.items])
+    if FAST_JSON:
+        return FastJSONResponse({"results": results})
+    return {"results": results}
+
+
+def _section_events(sections, fmt, timings):
+    # One NDJSON line or SSE event per section, flushed as soon as it is ready
+    try:
+        for name, value in sections:
+            with timings.step("serialize"):
+                if fmt == "sse":
+                    event = b"event: " + name.encode() + b"\ndata: " + dumps(value) + b"\n\n"
+                else:
+                    event = dumps({"section": name, "data": value}) + b"\n"
+            yield event
+    except AstrologyComputationError as exc:
+        logger.error("Computation error while streaming: %s", exc, exc_info=True)
+        if fmt == "sse":
+            yield b"event: error\ndata: " + dumps({"detail": str(exc)}) + b"\n\n"
+        else:
+            yield dumps({"error": str(exc)}) + b"\n"
+        return
+    finally:
+        stage_seconds.observe_all(timings)
+    if fmt == "sse":
+        yield b"event: end\ndata: {}\n\n"
+
+
+def _release_after(items, admission):
+    try:
+        yield from items
+    finally:
+        admission.release()
+
+
+def _admit_stream():
+    try:
+        return compute_executor.admit()
+    except ExecutorSaturated as exc:
+        logger.warning("Rejecting stream: %s", exc)
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy, retry later",
+            headers={"Retry-After": str(COMPUTE_RETRY_AFTER)},
+        ) from exc
+
+
+@app.post("/astrology/stream")
+async def stream_astrology(
+    payload: AstroRequest,
+    format: Literal["ndjson", "sse"] = Query("ndjson", description="NDJSON lines or server-sent events"),
+):
+    """
+    Same sections as /astrology, each sent as soon as it is computed
+    (cached sections first): NDJSON lines {"section": ..., "data": ...} or
+    SSE events named after the section, followed by an "end" event.
+    A failure mid-stream is reported as a final {"error": ...} line or
+    "error" event. The stream holds a compute_executor slot until it ends,
+    so a full queue gets 503 like /astrology.
+    """
+    timings = Timings()
+    admission = _admit_stream()
+    try:
+        sections = await run_in_threadpool(
+            astrology_section_stream, **_astrology_kwargs(payload), timings=timings
+        )
+    except AstrologyComputationError as exc:
+        admission.release()
+        logger.error("Computation error: %s", exc, exc_info=True)
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    except BaseException:
+        admission.release()
+        raise
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(
+        _release_after(_section_events(sections, format, timings), admission),
+        media_type=media_type,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Covers a client that disconnects before the body is started
+        background=BackgroundTask(admission.release),
+    )
+
+
+def _ndjson_chunks(items, lines_per_chunk=512):
+    # Sync iterators are pulled through the thread pool one item at a time,
+    # so hand Starlette a few hundred lines per item instead of one.
+    chunk = []
+    for item in items:
+        chunk.append(json.dumps(item))
+        if len(chunk) >= lines_per_chunk:
+            yield "\n".join(chunk) + "\n"
+            chunk = []
+    if chunk:
+        yield "\n".join(chunk) + "\n"
+
+
+@app.post("/astrology/dasha/stream")
+async def stream_dasha(payload: DashaStreamRequest):
+    """
+    Dasha periods down to `depth` as NDJSON, one period per line, parents
+    before children. The tree is never built in memory. Admitted through
+    compute_executor like /astrology/stream.
+    """
+    window_start = datetime.combine(payload.start, datetime.min.time()) if payload.start else None
+    window_end = datetime.combine(payload.end, datetime.min.time()) if payload.end else None
+    admission = _admit_stream()
+    try:
+        periods = await run_in_threadpool(
+            dasha_period_stream,
             dob=payload.dob,
             tob=payload.tob,
             tz_str=payload.tz,
             latitude=payload.latitude,
             longitude=payload.longitude,
+            depth=payload.depth,
+            window_start=window_start,
+            window_end=window_end,
         )
     except AstrologyComputationError as exc:
+        admission.release()
         logger.error("Computation error: %s", exc, exc_info=True)
         raise HTTPException(status_code=400, detail=str(exc)) from exc
-    except Exception as exc:  # pragma: no cover - just defensive
-        logger.exception("Unexpected error while processing request")
-        raise HTTPException(status_code=500, detail="Internal server error") from exc
+    except BaseException:
+        admission.release()
+        raise
+
+    return StreamingResponse(
+        _release_after(_ndjson_chunks(periods), admission),
+        media_type="application/x-ndjson",
+        background=BackgroundTask(admission.release),
+    )
 
 
 @app.exception_handler(Exception)
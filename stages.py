@@ -0,0 +1,252 @@
+# stages.py
+# astrology_full as a small dependency graph of named stages, one per
+# response section. Only the stages a request's sections need are run.
+
+from collections import namedtuple
+from datetime import datetime
+
+import pytz
+
+from astronomy import ChartContext, get_moon_longitude, get_sidereal_planets, calculate_lagna
+from nakshatra_utils import get_nakshatra
+from charts import get_rasi_chart
+from dasha import MAX_DASHA_DEPTH, get_dasha_balance_at_birth, build_dasha_tree
+from panchanga import calculate_panchanga
+from strengths import planet_strength
+from yogas import detect_yogas
+from remedies import remedies_for_chart
+from divisional import navamsa, dasamsa, saptamsa
+from transits import transit_vs_natal, sade_sati
+from transit_cache import snapshots as transit_snapshots
+from metrics import step
+
+DASHA_EXPAND_MODES = ("all", "current")
+
+Stage = namedtuple("Stage", "name deps fn")
+
+# name -> Stage, in registration order
+STAGES = {}
+
+
+def stage(name, *deps):
+    """Register fn(chart, results) as the stage producing section `name`."""
+    def register(fn):
+        STAGES[name] = Stage(name, deps, fn)
+        return fn
+    return register
+
+
+class ChartInput:
+    """
+    Request inputs shared by every stage. The ChartContext (time conversion,
+    observer, ayanamsa) is built on first use and timed as "context".
+    """
+
+    def __init__(self, dob, tob, tz_str, latitude, longitude,
+                 dasha_levels=MAX_DASHA_DEPTH, dasha_expand="all", timings=None):
+        if dasha_expand not in DASHA_EXPAND_MODES:
+            raise ValueError(f"Unknown dasha_expand '{dasha_expand}', expected one of {DASHA_EXPAND_MODES}.")
+        self.dob = dob
+        self.tob = tob
+        self.tz_str = tz_str
+        self.latitude = latitude
+        self.longitude = longitude
+        self.dasha_levels = dasha_levels
+        self.dasha_expand = dasha_expand
+        self.dt = datetime.strptime(dob + " " + tob, "%Y-%m-%d %H:%M")
+        self.timings = timings
+        self._ctx = None
+
+    @property
+    def ctx(self):
+        if self._ctx is None:
+            with step(self.timings, "context"):
+                self._ctx = ChartContext(self.dt, self.latitude, self.longitude, self.tz_str)
+        return self._ctx
+
+
+# ---------------------------------------------------
+# Stages
+# ---------------------------------------------------
+@stage("meta")
+def _meta(chart, results):
+    return {
+        "dob": chart.dob,
+        "tob": chart.tob,
+        "timezone": chart.tz_str,
+        "latitude": chart.latitude,
+        "longitude": chart.longitude
+    }
+
+
+@stage("ayanamsa")
+def _ayanamsa(chart, results):
+    return chart.ctx.ayanamsa
+
+
+@stage("moon", "ayanamsa")
+def _moon(chart, results):
+    moon_lon_trop = get_moon_longitude(chart.dt, chart.latitude, chart.longitude, chart.tz_str, ctx=chart.ctx)
+    moon_sidereal = (moon_lon_trop - results["ayanamsa"]) % 360
+    return {
+        "tropical": moon_lon_trop,
+        "sidereal": moon_sidereal,
+        "nakshatra": get_nakshatra(moon_sidereal)
+    }
+
+
+@stage("lagna")
+def _lagna(chart, results):
+    lagna_deg = calculate_lagna(chart.dt, chart.latitude, chart.longitude, chart.tz_str, ctx=chart.ctx)
+    return {
+        "degree": lagna_deg,
+        "sign_index": int(lagna_deg // 30)
+    }
+
+
+@stage("planets")
+def _planets(chart, results):
+    return get_sidereal_planets(chart.dt, chart.latitude, chart.longitude, chart.tz_str, ctx=chart.ctx)
+
+
+@stage("rasi_chart", "lagna", "planets")
+def _rasi_chart(chart, results):
+    return get_rasi_chart(results["lagna"]["degree"], results["planets"])
+
+
+@stage("panchanga", "planets")
+def _panchanga(chart, results):
+    planets = results["planets"]
+    return calculate_panchanga(planets["Sun"], planets["Moon"])
+
+
+@stage("dasha", "moon")
+def _dasha(chart, results):
+    dasha_balance = get_dasha_balance_at_birth(results["moon"]["sidereal"])
+    current = None
+    if chart.dasha_expand == "current":
+        current = datetime.now(pytz.timezone(chart.tz_str)).replace(tzinfo=None)
+    return {
+        "balance": dasha_balance,
+        "dv": build_dasha_tree(
+            dasha_balance["starting_mahadasha"], chart.dt, depth=chart.dasha_levels, current=current
+        )
+    }
+
+
+@stage("strengths", "planets")
+def _strengths(chart, results):
+    planets = results["planets"]
+    return [
+        planet_strength(name, planet_lon, sun_longitude=planets["Sun"])
+        for name, planet_lon in planets.items()
+    ]
+
+
+@stage("yogas", "rasi_chart")
+def _yogas(chart, results):
+    return detect_yogas(results["rasi_chart"]["planets"])
+
+
+@stage("divisional", "planets")
+def _divisional(chart, results):
+    return {
+        name: {
+            "D9": navamsa(planet_lon),
+            "D10": dasamsa(planet_lon),
+            "D7": saptamsa(planet_lon)
+        }
+        for name, planet_lon in results["planets"].items()
+    }
+
+
+@stage("remedies", "strengths")
+def _remedies(chart, results):
+    return remedies_for_chart(results["strengths"])
+
+
+@stage("transits", "planets", "moon")
+def _transits(chart, results):
+    transit_planets = transit_snapshots.get(chart.latitude, chart.longitude)
+    return {
+        "current": transit_planets,
+        "comparison": transit_vs_natal(results["planets"], transit_planets),
+        "sade_sati": sade_sati(
+            natal_moon_lon=results["moon"]["sidereal"],
+            saturn_transit_lon=transit_planets["Saturn"]
+        )
+    }
+
+
+# Response sections, in payload order
+SECTIONS = tuple(STAGES)
+
+# Sections fixed by the birth input alone (everything but live transits)
+NATAL_SECTIONS = tuple(name for name in SECTIONS if name != "transits")
+
+
+# ---------------------------------------------------
+# Planning and execution
+# ---------------------------------------------------
+def select_sections(include=None, exclude=None):
+    """
+    Sections to return, in payload order. Unknown names raise ValueError.
+    include=None means all sections; an explicit empty include means none.
+    """
+    for names in (include, exclude):
+        unknown = sorted(set(names or ()) - set(SECTIONS))
+        if unknown:
+            raise ValueError(f"Unknown sections {unknown}, expected some of {list(SECTIONS)}.")
+    wanted = set(SECTIONS) if include is None else set(include)
+    wanted -= set(exclude or ())
+    return [name for name in SECTIONS if name in wanted]
+
+
+def stream_order(sections):
+    """`sections` with the slow ones (dasha tree, live transits) moved to the end."""
+    slow = ("dasha", "transits")
+    return [name for name in sections if name not in slow] + [name for name in slow if name in sections]
+
+
+def volatile_sections(dasha_expand="all"):
+    """Sections that depend on the request itself or on the current time, so are never cached."""
+    volatile = {"meta", "transits"}
+    if dasha_expand == "current":
+        volatile.add("dasha")
+    return volatile
+
+
+def plan(targets, known=()):
+    """Stages to run for `targets`, dependencies first, stopping at `known` results."""
+    order = []
+    seen = set(known)
+
+    def visit(name):
+        if name in seen:
+            return
+        seen.add(name)
+        for dep in STAGES[name].deps:
+            visit(dep)
+        order.append(name)
+
+    for name in targets:
+        visit(name)
+    return order
+
+
+def iter_stages(chart, targets, known=None, timings=None):
+    """
+    Run the stages `targets` need, reusing `known` {section: value}, and
+    yield (section, value) for each newly computed one as soon as it is done.
+    Each stage is timed into `timings` (a metrics.Timings) when given.
+    """
+    results = dict(known or {})
+    for name in plan(targets, results):
+        with step(timings, name):
+            results[name] = STAGES[name].fn(chart, results)
+        yield name, results[name]
+
+
+def run_stages(chart, targets, known=None, timings=None):
+    """Like iter_stages, but returns the newly computed {section: value} at once."""
+    return dict(iter_stages(chart, targets, known, timings))
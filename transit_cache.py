@@ -0,0 +1,167 @@
+# transit_cache.py
+# Shared snapshot of current transits, reused by every request in a time bucket.
+
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+
+from config import TRANSIT_BUCKET_SECONDS, TRANSIT_TILE_DEGREES, TRANSIT_TTL_SECONDS
+from transits import current_transits
+
+logger = logging.getLogger("astrology_api.transits")
+
+
+class TransitSnapshotCache:
+    """
+    Caches current_transits() per (time bucket, location tile).
+
+    All requests inside the same `bucket_seconds` window and the same
+    `tile_degrees` lat/lon tile share one computation, evaluated at the
+    bucket start for the tile center.  Entries are evicted `ttl_seconds`
+    after they were computed, or as soon as their bucket has passed; the
+    first store in each new bucket does this, so the cache stays bounded
+    even in processes without the refresher (worker pools, bulk runs).
+    When the background refresher is running it precomputes the next
+    bucket for recently used tiles just before the boundary, so steady
+    traffic never computes transits on the hot path.
+    """
+
+    def __init__(self, bucket_seconds=60, ttl_seconds=300, tile_degrees=1.0):
+        self.bucket_seconds = bucket_seconds
+        self.ttl_seconds = ttl_seconds
+        self.tile_degrees = tile_degrees
+
+        self._entries = {}  # (bucket, tile) -> (expires_at, planets)
+        self._hot = {}      # tile -> last access (monotonic)
+        self._evicted_bucket = None  # bucket of the last eviction pass
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    # ---------------------------------------------------
+    # Keys
+    # ---------------------------------------------------
+    def bucket(self, now=None):
+        now = time.time() if now is None else now
+        return int(now // self.bucket_seconds)
+
+    def tile(self, lat, lon):
+        size = self.tile_degrees
+        return (round(lat / size) * size, round(lon / size) * size)
+
+    # ---------------------------------------------------
+    # Lookup
+    # ---------------------------------------------------
+    def get(self, lat, lon, now=None):
+        """Return sidereal transit longitudes {planet: lon} for the current bucket."""
+        key = (self.bucket(now), self.tile(lat, lon))
+        mono = time.monotonic()
+
+        with self._lock:
+            self._hot[key[1]] = mono
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > mono:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        return self._store(key, now)
+
+    def _compute(self, key):
+        bucket, (tile_lat, tile_lon) = key
+        instant = datetime.fromtimestamp(bucket * self.bucket_seconds, tz=timezone.utc)
+        return current_transits(instant.replace(tzinfo=None), tile_lat, tile_lon, "UTC")
+
+    def _store(self, key, now=None):
+        planets = self._compute(key)
+        with self._lock:
+            mono = time.monotonic()
+            current_bucket = self.bucket(now)
+            if current_bucket != self._evicted_bucket:
+                self._evict(mono, current_bucket)
+            self._entries[key] = (mono + self.ttl_seconds, planets)
+        return planets
+
+    def _evict(self, mono, current_bucket):
+        # Caller holds the lock. Keeps the current bucket and the next one
+        # (which the refresher precomputes); drops anything expired or older.
+        self._entries = {
+            k: v for k, v in self._entries.items() if v[0] > mono and k[0] >= current_bucket
+        }
+        self._hot = {t: seen for t, seen in self._hot.items() if mono - seen < self.ttl_seconds}
+        self._evicted_bucket = current_bucket
+
+    # ---------------------------------------------------
+    # Background refresh
+    # ---------------------------------------------------
+    def refresh(self, now=None):
+        """Precompute the next bucket for tiles used within the TTL; evict expired entries."""
+        mono = time.monotonic()
+        next_bucket = self.bucket(now) + 1
+
+        with self._lock:
+            self._evict(mono, next_bucket - 1)
+            pending = [(next_bucket, t) for t in self._hot if (next_bucket, t) not in self._entries]
+
+        for key in pending:
+            try:
+                self._store(key, now)
+            except Exception:
+                logger.exception("Transit snapshot refresh failed for %s", key)
+                continue
+            with self._lock:
+                self.refreshes += 1
+
+    def _run(self):
+        lead = min(5.0, self.bucket_seconds / 4)
+        while True:
+            now = time.time()
+            next_boundary = (self.bucket(now) + 1) * self.bucket_seconds
+            if self._stop.wait(max(0.0, next_boundary - lead - now)):
+                return
+            self.refresh()
+            # sleep past the boundary so one bucket is refreshed once
+            if self._stop.wait(lead):
+                return
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="transit-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "refreshes": self.refreshes,
+                "entries": len(self._entries),
+                "hot_tiles": len(self._hot),
+                "bucket_seconds": self.bucket_seconds,
+                "ttl_seconds": self.ttl_seconds,
+                "tile_degrees": self.tile_degrees,
+                "refresher_running": self._thread is not None and self._thread.is_alive(),
+            }
+
+
+# Process-wide instance used by astrology_full and the server
+snapshots = TransitSnapshotCache(
+    bucket_seconds=TRANSIT_BUCKET_SECONDS,
+    ttl_seconds=TRANSIT_TTL_SECONDS,
+    tile_degrees=TRANSIT_TILE_DEGREES,
+)
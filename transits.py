@@ -5,9 +5,10 @@ from astronomy import get_planet_longitudes
 from datetime import datetime
 from ayanamsa import calculate_ayanamsa
 
-def current_transits(dt, latitude, longitude, tz_str, sidereal=True):
-    """Return current planetary longitudes (sidereal if sidereal=True)."""
-    return get_planet_longitudes(dt, latitude, longitude, tz_str, sidereal=sidereal)
+def current_transits(dt, latitude, longitude, tz_str, sidereal=True, ctx=None):
+    """Return current planetary longitudes (sidereal if sidereal=True).
+    Pass a ChartContext built for `dt` as ctx to reuse its time and observer."""
+    return get_planet_longitudes(dt, latitude, longitude, tz_str, sidereal=sidereal, ctx=ctx)
 
 def transit_vs_natal(natal_planets, transit_planets):
     """